@@ -21,19 +21,30 @@ Kaggle 사용 시 (선택):
 
 from __future__ import annotations
 import os
+import gzip
+import hashlib
+import importlib.util
 import io
 import json
 import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, date, timedelta, timezone
 from dateutil.tz import gettz
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import plotly.express as px
+import plotly.graph_objects as go
 import pydeck as pdk
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # ---------------------------
 # 환경/상수
@@ -47,12 +58,135 @@ TODAY = datetime.now(TZ).date()
 FONT_PATH = "/fonts/Pretendard-Bold.ttf"
 CUSTOM_FONT_AVAILABLE = os.path.exists(FONT_PATH)
 
+# Parquet 엔진(pyarrow/fastparquet) 설치 시에만 Parquet 내보내기 제공
+PARQUET_AVAILABLE = any(importlib.util.find_spec(m) is not None for m in ("pyarrow", "fastparquet"))
+
 # API 키 (환경변수로 전달 권장)
 KOSIS_API_KEY = os.environ.get("KOSIS_API_KEY", "")
 DATA_GO_KEY = os.environ.get("DATA_GO_KR_KEY", "")
 SGIS_ACCESS_KEY = os.environ.get("SGIS_ACCESS_KEY", "")
 SGIS_SECRET_KEY = os.environ.get("SGIS_SECRET_KEY", "")
 
+# HTTP: 출처별 (연결, 읽기) 타임아웃(초) 및 재시도(지수 백오프 + 지터)
+SOURCE_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "geojson": (5, 20),
+    "closed_schools": (5, 20),
+    "population": (5, 30),
+}
+HTTP_RETRY_TOTAL = 3
+HTTP_BACKOFF_FACTOR = 0.5   # 0.5s, 1s, 2s ...
+HTTP_BACKOFF_JITTER = 0.3   # 각 대기시간에 0~0.3s 무작위 추가
+HTTP_RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# 헤지(hedged) 요청: 1순위가 HEDGE_DELAY_SEC 내 무응답이면 다음 출처를 병렬 시작.
+# 1순위 응답시간 기록이 충분하면 그 p95를 지연 기준으로 사용(상한 HEDGE_DELAY_SEC).
+# 하위 출처가 먼저 도착해도 상위 출처가 진행 중이면 HEDGE_GRACE_SEC 동안 기다려 상위 우선.
+HEDGE_DELAY_SEC = float(os.environ.get("HEDGE_DELAY_SEC", "3.0"))
+HEDGE_GRACE_SEC = float(os.environ.get("HEDGE_GRACE_SEC", "0.5"))
+HEDGE_MIN_SAMPLES = 5
+
+# data.go.kr JSON API 페이지 수집: 1페이지의 totalCount로 페이지 수 결정 → 나머지는 병렬(동시 요청 수 제한)
+DATA_GO_PER_PAGE = int(os.environ.get("DATA_GO_PER_PAGE", "1000"))
+DATA_GO_MAX_WORKERS = int(os.environ.get("DATA_GO_MAX_WORKERS", "4"))
+
+# 폐교 CSV 스트리밍 수집: 청크 단위로 읽으며 서울 행/사용 컬럼만 유지 → 최대 메모리 ∝ 서울 부분집합
+CSV_CHUNK_ROWS = 20000
+CLOSED_SCHOOL_COLUMNS = ["학교명", "폐교연도", "위도", "경도", "자치구"]
+
+# KOSIS OpenAPI: 주민등록인구(시군구/성/5세 연령별) 통계표. 표/항목 ID는 환경변수로 교체 가능.
+KOSIS_PARAM_URL = "https://kosis.kr/openapi/Param/statisticsParameterData.do"
+KOSIS_ORG_ID = os.environ.get("KOSIS_ORG_ID", "101")
+KOSIS_POP_TBL_ID = os.environ.get("KOSIS_POP_TBL_ID", "DT_1B04005N")
+KOSIS_POP_ITM_IDS = os.environ.get("KOSIS_POP_ITM_IDS", "T2+T4+")   # 총인구수 + 여자인구수
+KOSIS_START_YEAR = 2010
+KOSIS_YEAR_BATCH = 5        # 요청당 연도 수
+KOSIS_GU_BATCH = 5          # 요청당 자치구 수 (요청당 셀 수 제한 내 유지)
+KOSIS_MAX_WORKERS = 4
+KOSIS_MIN_INTERVAL_SEC = 0.25   # 전체 요청 간 최소 간격(호출 빈도 제한 준수)
+
+# SGIS OpenAPI3: 인증 토큰(만료 직전까지 재사용) + 행정구역 경계(서울=11, 하위 1단계=자치구)
+SGIS_AUTH_URL = "https://sgisapi.kostat.go.kr/OpenAPI3/auth/authentication.json"
+SGIS_BOUNDARY_URL = "https://sgisapi.kostat.go.kr/OpenAPI3/boundary/hadmarea.geojson"
+SGIS_BOUNDARY_YEAR = os.environ.get("SGIS_BOUNDARY_YEAR", str(TODAY.year - 2))
+SGIS_TOKEN_MARGIN_SEC = 120   # 만료 2분 전부터 재발급
+
+# SGIS 경계 좌표계: UTM-K (EPSG:5179, GRS80 타원체)
+UTMK_A = 6378137.0
+UTMK_F = 1 / 298.257222101
+UTMK_LAT0 = 38.0
+UTMK_LON0 = 127.5
+UTMK_K0 = 0.9996
+UTMK_FE = 1_000_000.0
+UTMK_FN = 2_000_000.0
+
+# 서울시 자치구 행정구역 코드(KOSIS objL1)
+SEOUL_GU_CODES: Dict[str, str] = {
+    "11010": "종로구", "11020": "중구", "11030": "용산구", "11040": "성동구", "11050": "광진구",
+    "11060": "동대문구", "11070": "중랑구", "11080": "성북구", "11090": "강북구", "11100": "도봉구",
+    "11110": "노원구", "11120": "은평구", "11130": "서대문구", "11140": "마포구", "11150": "양천구",
+    "11160": "강서구", "11170": "구로구", "11180": "금천구", "11190": "영등포구", "11200": "동작구",
+    "11210": "관악구", "11220": "서초구", "11230": "강남구", "11240": "송파구", "11250": "강동구",
+}
+
+# 지도 초기 화면: 경계가 없을 때의 기본값, 경계 맞춤 계산 시 가정하는 지도 크기(px)
+DEFAULT_VIEW = {"latitude": 37.5665, "longitude": 126.9780, "zoom": 10.0}
+MAP_VIEWPORT_PX = (600, 400)
+
+# 경계 단순화 단계: 단계 → 담당 최대 줌. 허용오차 = 해당 줌에서 SIMPLIFY_TOLERANCE_PX 픽셀
+SIMPLIFY_TIERS = {"overview": 9.0, "district": 11.0, "detail": 13.0}
+SIMPLIFY_TOLERANCE_PX = 0.5
+VERTEX_SNAP_DECIMALS = 7   # 인접 구 공유 꼭짓점 판정 자릿수(≈1cm)
+BOUNDARY_QUANTIZATION = 100_000   # 경계 저장 격자(축당 단계 수, 서울 범위 ≈ 0.4m 간격)
+DISTRICT_INDEX_BANDS = 256        # 점-다각형 판정 인덱스의 위도 띠 개수
+FALLBACK_SPIRAL_STEP_M = 120      # 구 중심 대체 좌표의 해바라기 나선 간격(겹침 방지)
+METERS_PER_DEG_LAT = 111_320
+
+# 지도 확대 수준 슬라이더 범위(pydeck은 화면 줌을 서버에 알려주지 않으므로 서버측 단계/집계 선택용)
+# 폐교 점 지도: 확대 수준별 서버측 육각 집계(자동 = POINT_DETAIL_ZOOM 미만은 집계, 이상은 개별 점)
+POINT_MODES = ["자동", "육각 집계", "개별 점"]
+MAP_ZOOM_RANGE = (8.0, 15.0)
+POINT_DETAIL_ZOOM = 13.0
+HEX_RADIUS_PX = 24
+EARTH_RADIUS_M = 6_378_137.0
+
+# Choropleth 색상: 팔레트 정지점 → 256단계 LUT, 척도(선형/분위수/발산)는 값 배열 단위로 계산
+COLOR_PALETTES: Dict[str, List[Tuple[int, int, int]]] = {
+    "기본(파랑→빨강)": [(0, 150, 255), (255, 30, 0)],
+    "발산(파랑–흰–빨강)": [(33, 102, 172), (247, 247, 247), (178, 24, 43)],
+    "순차(노랑→적갈)": [(255, 255, 204), (253, 141, 60), (128, 0, 38)],
+}
+COLOR_SCALES = ["선형", "분위수(5분위)", "발산(소멸위험 기준)"]
+QUANTILE_CLASSES = 5
+EXTINCTION_RISK_RATIO = 0.5   # 여성20–39/65+ < 0.5 → 소멸위험 (발산 척도의 중심)
+FILL_ALPHA = 160
+NAN_RGBA = (200, 200, 200, 90)
+LEGEND_SWATCHES = 8
+ANIMATION_FRAME_MS = 600
+
+# 본문 화면 (선택된 화면만 실행)
+VIEW_OPTIONS = ["🗺️ 지도 (연도별)", "📈 구별 비교", "📄 표/다운로드"]
+
+# 내보내기 형식: 라벨 → (확장자, MIME). 다운로드 클릭 시에만 생성
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# 인구소멸 파생 데이터 변형: 단위 × 스무딩(이동평균) 윈도우
+UNIT_OPTIONS = ["지수(×100)", "비율"]
+SMOOTH_WINDOWS = [1, 3, 5]
+
+# 원천 데이터 캐시: 메모리(세션 공유) + 디스크(재시작/재배포 후에도 마지막 실제 데이터를 즉시 제공)
+# TTL 경과 시 stale-while-revalidate: 기존 데이터를 즉시 제공하고 백그라운드에서 1회만 갱신
+SOURCE_TTL_SEC = 60*30
+SOURCE_REFRESH_RETRY_SEC = 60*5   # 갱신 실패 후 재시도 간격
+DISK_CACHE_DIR = os.environ.get(
+    "APP_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sources")
+)
+
+GITHUB_GEOJSON_URL = "https://raw.githubusercontent.com/southkorea/seoul-maps/master/json/seoul_municipalities_geo_simple.json"
+
 # ---------------------------
 # 유틸리티
 # ---------------------------
@@ -80,17 +214,73 @@ def remove_future_rows(df: pd.DataFrame, date_col: str = "date") -> pd.DataFrame
     cutoff = seoul_midnight_today()
     return df[df[date_col] < cutoff]
 
-def moving_average(series: pd.Series, window: int) -> pd.Series:
-    if window is None or window <= 1:
-        return series
-    return series.rolling(window=window, min_periods=max(1, window//2)).mean()
-
 def try_parse_float(x):
     try:
         return float(x)
     except Exception:
         return np.nan
 
+@st.cache_resource(show_spinner=False)
+def palette_lut(palette: str) -> np.ndarray:
+    """팔레트 정지점을 선형 보간한 (256, 3) uint8 LUT."""
+    stops = np.asarray(COLOR_PALETTES[palette], dtype=float)
+    pos = np.linspace(0.0, 1.0, len(stops))
+    grid = np.linspace(0.0, 1.0, 256)
+    return np.column_stack([np.interp(grid, pos, stops[:, c]) for c in range(3)]).round().astype(np.uint8)
+
+def scale_values(values: np.ndarray, scale: str, center: float | None = None) -> Tuple[np.ndarray, List[float]]:
+    """
+    값 배열 → [0,1] 위치(NaN 유지). 범례 눈금 값(양 끝 포함)도 같은 척도로 반환.
+      선형: 최소~최대 (모두 같으면 0.5)
+      분위수: QUANTILE_CLASSES 등급 → 등급 중앙 위치
+      발산: center 기준 대칭, 최대 편차로 정규화
+    """
+    v = np.asarray(values, dtype=float)
+    finite = v[np.isfinite(v)]
+    t = np.full(v.shape, np.nan)
+    if finite.size == 0:
+        return t, [0.0, 1.0]
+    lo, hi = float(finite.min()), float(finite.max())
+    ok = np.isfinite(v)
+    if scale.startswith("분위수"):
+        edges = np.quantile(finite, np.linspace(0, 1, QUANTILE_CLASSES + 1))
+        cls = np.clip(np.searchsorted(edges[1:-1], v[ok], side="right"), 0, QUANTILE_CLASSES - 1)
+        t[ok] = (cls + 0.5) / QUANTILE_CLASSES
+        return t, [float(e) for e in edges]
+    if scale.startswith("발산") and center is not None:
+        half = max(abs(hi - center), abs(lo - center)) or 1.0
+        t[ok] = 0.5 + 0.5 * (v[ok] - center) / half
+        return t, [center - half, center, center + half]
+    if hi > lo:
+        t[ok] = (v[ok] - lo) / (hi - lo)
+    else:
+        t[ok] = 0.5
+    return t, [lo, (lo + hi) / 2, hi]
+
+def colorize(values: np.ndarray, palette: str, scale: str, center: float | None = None) -> dict:
+    """
+    값 배열 → RGBA (N,4) uint8 를 LUT 인덱싱 한 번으로 계산. NaN은 NAN_RGBA.
+    같은 척도로 범례 색/눈금도 만들어 지도와 범례가 항상 일치.
+    반환: {"rgba", "legend_colors"(hex), "legend_ticks"(값)}
+    """
+    lut = palette_lut(palette)
+    t, tick_vals = scale_values(values, scale, center)
+    idx = np.clip(np.nan_to_num(t, nan=0.0) * 255, 0, 255).round().astype(np.intp)
+    rgba = np.empty((len(t), 4), dtype=np.uint8)
+    rgba[:, :3] = lut[idx]
+    rgba[:, 3] = FILL_ALPHA
+    rgba[np.isnan(t)] = NAN_RGBA
+    if scale.startswith("분위수"):
+        swatch_t = (np.arange(QUANTILE_CLASSES) + 0.5) / QUANTILE_CLASSES
+    else:
+        swatch_t = np.linspace(0, 1, LEGEND_SWATCHES)
+    swatches = lut[(swatch_t * 255).round().astype(np.intp)]
+    return {
+        "rgba": rgba,
+        "legend_colors": ["#%02X%02X%02X" % tuple(c) for c in swatches],
+        "legend_ticks": tick_vals,
+    }
+
 def color_scale_legend_html(title: str, colors: List[str], ticks: List[str]) -> str:
     # 간단한 HTML 범례 (pydeck과 함께 표시)
     rects = "".join([f'<div style="flex:1;height:10px;background:{c};"></div>' for c in colors])
@@ -104,61 +294,765 @@ def color_scale_legend_html(title: str, colors: List[str], ticks: List[str]) ->
     """
 
 # ---------------------------
-# 데이터 로딩 (캐시)
+# HTTP 세션 (커넥션 풀 + 재시도)
+# ---------------------------
+@st.cache_resource(show_spinner=False)
+def get_http_session() -> requests.Session:
+    """
+    프로세스 전체에서 공유하는 requests.Session.
+    keep-alive 커넥션 풀로 TLS 핸드셰이크 반복을 없애고,
+    일시적 오류(연결 실패/5xx/429)는 지수 백오프+지터로 재시도.
+    """
+    retry = Retry(
+        total=HTTP_RETRY_TOTAL,
+        connect=HTTP_RETRY_TOTAL,
+        read=HTTP_RETRY_TOTAL,
+        status=HTTP_RETRY_TOTAL,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        status_forcelist=HTTP_RETRY_STATUS,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": "jibang-vanish-dashboard/1.0"})
+    return session
+
+def http_get(url: str, source: str, **kwargs) -> requests.Response:
+    """공유 세션으로 GET. source(SOURCE_TIMEOUTS 키)별 타임아웃 적용, 최종 실패 시 HTTPError."""
+    kwargs.setdefault("timeout", SOURCE_TIMEOUTS.get(source, (5, 20)))
+    r = get_http_session().get(url, **kwargs)
+    r.raise_for_status()
+    return r
+
+@st.cache_resource(show_spinner=False)
+def http_validator_cache() -> Dict[str, dict]:
+    """요청 URL(쿼리 포함) → {etag, last_modified, parsed}. 304 응답 시 parsed 재사용."""
+    return {}
+
+def conditional_get(url: str, source: str, parse: Callable[[requests.Response], object],
+                    params: dict | None = None, **kwargs) -> Tuple[object, bool]:
+    """
+    ETag / Last-Modified 검증자를 저장해 두고 If-None-Match / If-Modified-Since 로 재요청.
+    304(Not Modified)면 다운로드/파싱 없이 이전 parse 결과를 그대로 반환.
+    parse는 응답 → 최종 객체(필터링까지 포함)로 변환하는 함수.
+
+    반환: (parse 결과, 변경 여부)
+    """
+    key = requests.Request("GET", url, params=params).prepare().url
+    store = http_validator_cache()
+    cached = store.get(key)
+    headers = dict(kwargs.pop("headers", None) or {})
+    if cached is not None:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    r = http_get(url, source, params=params, headers=headers, **kwargs)
+    if r.status_code == 304 and cached is not None:
+        r.close()   # stream=True 요청이면 본문을 읽지 않았으므로 연결을 풀에 직접 반환
+        return cached["parsed"], False
+    parsed = parse(r)
+    etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    if etag or last_modified:
+        store[key] = {"etag": etag, "last_modified": last_modified, "parsed": parsed}
+    return parsed, True
+
+def script_ctx_initializer() -> Callable[[], None]:
+    """작업 스레드가 현재 세션의 ScriptRunContext를 보도록 하는 ThreadPoolExecutor initializer."""
+    ctx = get_script_run_ctx()
+
+    def attach_ctx():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+    return attach_ctx
+
+# ---------------------------
+# 헤지 요청 (대체 출처 체인)
+# ---------------------------
+@st.cache_resource(show_spinner=False)
+def source_latency_log() -> Dict[str, deque]:
+    """출처 라벨별 최근 성공 응답시간(초). 헤지 지연(p95) 산정용."""
+    return {}
+
+def hedge_delay_for(label: str) -> float:
+    samples = list(source_latency_log().get(label, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DELAY_SEC
+    return float(min(HEDGE_DELAY_SEC, max(0.2, np.percentile(samples, 95))))
+
+def hedged_first(candidates: List[Tuple[str, Callable[[], object]]],
+                 grace: float = HEDGE_GRACE_SEC):
+    """
+    우선순위 순 후보 [(라벨, 호출함수)]를 헤지 방식으로 실행.
+    - 1순위부터 시작, 지연 기준(hedge_delay_for) 내 응답이 없거나 실패하면 다음 후보를 병렬 시작
+    - 가장 먼저 성공(예외 없이 반환)한 결과 채택. 단, 더 높은 우선순위 후보가 진행 중이면
+      grace 초 동안 기다려 상위 결과를 우선
+    - 남은 요청은 기다리지 않음(백그라운드에서 종료)
+
+    반환: (결과, 라벨) 또는 모두 실패 시 None
+    """
+    if not candidates:
+        return None
+    latency = source_latency_log()
+    ex = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="hedge",
+                            initializer=script_ctx_initializer())
+    futures: Dict[int, object] = {}
+    started: Dict[int, float] = {}
+    results: Dict[int, object] = {}
+    failed: set = set()
+    next_launch_at = 0.0
+    win_deadline = None
+
+    def launch():
+        nonlocal next_launch_at
+        i = len(futures)
+        label, fn = candidates[i]
+        started[i] = time.monotonic()
+        futures[i] = ex.submit(fn)
+        next_launch_at = started[i] + hedge_delay_for(label)
+
+    try:
+        launch()
+        while True:
+            now = time.monotonic()
+            if results:
+                best = min(results)
+                higher_pending = any(i < best and i not in failed for i in futures)
+                if not higher_pending:
+                    return results[best], candidates[best][0]
+                if win_deadline is None:
+                    win_deadline = now + grace
+                if now >= win_deadline:
+                    return results[best], candidates[best][0]
+
+            pending = {f: i for i, f in futures.items() if i not in results and i not in failed}
+            can_launch = not results and len(futures) < len(candidates)
+            if can_launch and (not pending or now >= next_launch_at):
+                launch()
+                continue
+            if not pending:
+                return None
+
+            timeouts = []
+            if can_launch:
+                timeouts.append(next_launch_at - now)
+            if win_deadline is not None:
+                timeouts.append(win_deadline - now)
+            done, _ = wait(list(pending), timeout=max(0.0, min(timeouts)) if timeouts else None,
+                           return_when=FIRST_COMPLETED)
+            for f in done:
+                i = pending[f]
+                try:
+                    results[i] = f.result()
+                    label = candidates[i][0]
+                    latency.setdefault(label, deque(maxlen=50)).append(time.monotonic() - started[i])
+                except Exception:
+                    failed.add(i)
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+
 # ---------------------------
+# 디스크 캐시 (내용 주소 기반 blob + 메타데이터)
+# ---------------------------
+def atomic_write_bytes(path: str, payload: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(payload)
+    os.replace(tmp, path)
+
+def serialize_source_data(data) -> Tuple[bytes, str]:
+    """DataFrame → Parquet(불가 시 JSON split), dict(GeoJSON) → JSON."""
+    if isinstance(data, pd.DataFrame):
+        try:
+            buf = io.BytesIO()
+            data.to_parquet(buf, index=False)
+            return buf.getvalue(), "parquet"
+        except Exception:
+            return data.to_json(orient="split", force_ascii=False, index=False).encode("utf-8"), "df-json"
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), "json"
+
+def deserialize_source_data(payload: bytes, fmt: str):
+    if fmt == "parquet":
+        return pd.read_parquet(io.BytesIO(payload))
+    if fmt == "df-json":
+        return pd.read_json(io.BytesIO(payload), orient="split")
+    return json.loads(payload.decode("utf-8"))
+
+def content_fingerprint(data) -> str:
+    """원자료 내용 해시(디스크 blob 이름과 동일). 파생 데이터 캐시의 버전 키로 사용."""
+    payload, _ = serialize_source_data(data)
+    return hashlib.sha256(payload).hexdigest()
+
+def disk_cache_put(name: str, data, source_label: str, collected_date: str) -> str | None:
+    """
+    {DISK_CACHE_DIR}/blobs/<sha256>.<fmt> 에 원자료 저장(동일 내용은 재기록 안 함),
+    {DISK_CACHE_DIR}/index/<name>.json 에 최신 blob 포인터 + 메타데이터 기록.
+    포인터가 바뀌면 이전 blob은 다른 출처가 참조하지 않을 때 삭제(출처당 blob 1개 유지).
+    반환: 내용 해시(sha256). 실패해도 앱 동작에는 영향 없음(None).
+    """
+    try:
+        index_path = os.path.join(DISK_CACHE_DIR, "index", f"{name}.json")
+        previous = read_json_file(index_path)
+        payload, fmt = serialize_source_data(data)
+        digest = hashlib.sha256(payload).hexdigest()
+        blob_path = os.path.join(DISK_CACHE_DIR, "blobs", f"{digest}.{fmt}")
+        if not os.path.exists(blob_path):
+            atomic_write_bytes(blob_path, payload)
+        meta = {
+            "blob": digest,
+            "format": fmt,
+            "fetched_at": time.time(),
+            "source_label": source_label,
+            "collected_date": collected_date,
+        }
+        atomic_write_bytes(index_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        if previous and (previous.get("blob"), previous.get("format")) != (digest, fmt):
+            disk_cache_drop_blob(previous.get("blob"), previous.get("format"))
+        return digest
+    except Exception:
+        return None
+
+def read_json_file(path: str) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except Exception:
+        return None
+
+def disk_cache_drop_blob(digest: str | None, fmt: str | None):
+    """어느 index도 가리키지 않는 blob 삭제(다른 출처와 내용이 같아 공유 중이면 유지)."""
+    if not digest or not fmt:
+        return
+    index_dir = os.path.join(DISK_CACHE_DIR, "index")
+    for fname in os.listdir(index_dir):
+        meta = read_json_file(os.path.join(index_dir, fname)) if fname.endswith(".json") else None
+        if meta and (meta.get("blob"), meta.get("format")) == (digest, fmt):
+            return
+    try:
+        os.remove(os.path.join(DISK_CACHE_DIR, "blobs", f"{digest}.{fmt}"))
+    except OSError:
+        pass
+
+def disk_cache_get(name: str) -> dict | None:
+    """반환: {data, source_label, collected_date, fetched_at, blob} 또는 None(없음/손상)."""
+    try:
+        with open(os.path.join(DISK_CACHE_DIR, "index", f"{name}.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        with open(os.path.join(DISK_CACHE_DIR, "blobs", f"{meta['blob']}.{meta['format']}"), "rb") as fh:
+            meta["data"] = deserialize_source_data(fh.read(), meta["format"])
+        return meta
+    except Exception:
+        return None
 
-@st.cache_data(show_spinner=False, ttl=60*30)
+# ---------------------------
+# 원천 데이터 슬롯 (stale-while-revalidate)
+# ---------------------------
+class SourceSlot:
+    """
+    출처 하나의 메모리 캐시(세션 간 공유).
+    entry = (data, source_label, collected_date, fetched_at, version) 튜플을 통째로 교체 → 원자적 스왑.
+    version은 원자료 내용 해시(content_fingerprint)로, 파생 데이터 캐시 키에 사용.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entry: Tuple[object, str, str, float, str] | None = None
+        self.refreshing = False
+        self.last_attempt = 0.0
+
+@st.cache_resource(show_spinner=False)
+def source_slot(name: str) -> SourceSlot:
+    return SourceSlot()
+
+def fetch_source_entry(name: str, fetch_network: Callable[[], Tuple[object, str, str]],
+                       fallback: Tuple[object, str, str, float, str] | None = None) -> Tuple[object, str, str, float, str]:
+    """
+    네트워크 조회 → 실제 출처면 디스크에 기록.
+    예시 데이터로 떨어진 경우 fallback(기존 실제 데이터)이 있으면 그것을 유지.
+    """
+    data, label, collected = fetch_network()
+    if "예시" not in label:
+        version = disk_cache_put(name, data, label, collected) or content_fingerprint(data)
+        return data, label, collected, time.time(), version
+    if fallback is not None and "예시" not in fallback[1]:
+        return fallback
+    return data, label, collected, time.time(), content_fingerprint(data)
+
+def start_background_refresh(name: str, slot: SourceSlot,
+                             fetch_network: Callable[[], Tuple[object, str, str]]) -> None:
+    """슬롯당 동시에 하나의 갱신 스레드만 실행(세션 간 중복 제거). 완료 시 entry 교체."""
+    with slot.lock:
+        if slot.refreshing or time.time() - slot.last_attempt < SOURCE_REFRESH_RETRY_SEC:
+            return
+        slot.refreshing = True
+        slot.last_attempt = time.time()
+
+    def run():
+        try:
+            slot.entry = fetch_source_entry(name, fetch_network, fallback=slot.entry)
+        except Exception:
+            pass
+        finally:
+            slot.refreshing = False
+
+    t = threading.Thread(target=run, name=f"refresh-{name}", daemon=True)
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        add_script_run_ctx(t, ctx)
+    t.start()
+
+def get_source(name: str, fetch_network: Callable[[], Tuple[object, str, str]]) -> Tuple[object, str, str, float, str]:
+    """
+    메모리 → 디스크(나이 무관) → 네트워크 순으로 첫 값을 확보(최초 1회만 대기).
+    이후 TTL이 지나면 기존 값을 즉시 반환하고 백그라운드 갱신을 시작.
+    반환 데이터는 세션 간 공유 객체이므로 호출 측에서 수정하지 말 것.
+    """
+    slot = source_slot(name)
+    if slot.entry is None:
+        with slot.lock:
+            if slot.entry is None:
+                hit = disk_cache_get(name)
+                if hit is not None:
+                    slot.entry = (hit["data"], hit["source_label"], hit["collected_date"],
+                                  hit["fetched_at"], hit["blob"])
+                else:
+                    slot.last_attempt = time.time()
+                    slot.entry = fetch_source_entry(name, fetch_network)
+    entry = slot.entry
+    if time.time() - entry[3] >= SOURCE_TTL_SEC:
+        start_background_refresh(name, slot, fetch_network)
+    return entry
+
+def source_version(name: str, data) -> str:
+    """data가 슬롯의 현재 값이면 저장된 내용 해시를, 아니면(갱신으로 교체됨 등) 새로 계산."""
+    entry = source_slot(name).entry
+    if entry is not None and entry[0] is data:
+        return entry[4]
+    return content_fingerprint(data)
+
+def source_status(name: str) -> Tuple[float | None, bool]:
+    """반환: (데이터 나이(초) 또는 None, 백그라운드 갱신 중 여부)"""
+    slot = source_slot(name)
+    entry = slot.entry
+    if entry is None:
+        return None, slot.refreshing
+    return time.time() - entry[3], slot.refreshing
+
+def format_age(age_sec: float | None) -> str:
+    if age_sec is None:
+        return "-"
+    if age_sec < 60:
+        return "방금 전"
+    if age_sec < 3600:
+        return f"{int(age_sec // 60)}분 전"
+    if age_sec < 86400:
+        return f"{int(age_sec // 3600)}시간 전"
+    return f"{int(age_sec // 86400)}일 전"
+
+def source_age_label(name: str) -> str:
+    age, refreshing = source_status(name)
+    return format_age(age) + (" · 백그라운드 갱신 중" if refreshing else "")
+
+# ---------------------------
+# KOSIS OpenAPI (연도×자치구 배치, 병렬, 연도별 원자료 캐시)
+# ---------------------------
+class RateLimiter:
+    """스레드 간 공유되는 최소 호출 간격 제한."""
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_at)
+            self.next_at = slot + self.min_interval
+        time.sleep(max(0.0, slot - now))
+
+@st.cache_resource(show_spinner=False)
+def kosis_rate_limiter() -> RateLimiter:
+    return RateLimiter(KOSIS_MIN_INTERVAL_SEC)
+
+def kosis_cache_path(tbl_id: str, year: int) -> str:
+    return os.path.join(DISK_CACHE_DIR, "kosis", f"{KOSIS_ORG_ID}_{tbl_id}_{year}.json")
+
+def kosis_request(tbl_id: str, gu_codes: List[str], start_year: int, end_year: int) -> list:
+    """통계표 1회 조회(자치구 묶음 × 연도 구간). 데이터 없음(err 30)은 빈 목록."""
+    kosis_rate_limiter().wait()
+    params = {
+        "method": "getList", "apiKey": KOSIS_API_KEY, "format": "json", "jsonVD": "Y",
+        "orgId": KOSIS_ORG_ID, "tblId": tbl_id, "itmId": KOSIS_POP_ITM_IDS,
+        "objL1": "+".join(gu_codes) + "+", "objL2": "ALL",
+        "prdSe": "Y", "startPrdDe": str(start_year), "endPrdDe": str(end_year),
+    }
+    js = http_get(KOSIS_PARAM_URL, "population", params=params).json()
+    if isinstance(js, dict):
+        if str(js.get("err")) == "30":
+            return []
+        raise RuntimeError(f"KOSIS 오류 {js.get('err')}: {js.get('errMsg')}")
+    return js
+
+def fetch_kosis_raw_rows(tbl_id: str, years: List[int]) -> list:
+    """
+    (통계표, 연도) 단위 원자료를 디스크에 캐시하고, 캐시에 없는 연도만 조회.
+    누락 연도를 KOSIS_YEAR_BATCH 구간 × KOSIS_GU_BATCH 자치구 묶음으로 나눠 병렬 요청.
+    25개 구가 모두 채워진 연도만 캐시(미공표/부분 공표 연도는 다음에 재조회).
+    """
+    rows, missing = [], []
+    for y in years:
+        try:
+            with open(kosis_cache_path(tbl_id, y), encoding="utf-8") as fh:
+                rows.extend(json.load(fh))
+        except Exception:
+            missing.append(y)
+    if not missing:
+        return rows
+
+    codes = list(SEOUL_GU_CODES)
+    gu_batches = [codes[i:i + KOSIS_GU_BATCH] for i in range(0, len(codes), KOSIS_GU_BATCH)]
+    year_batches = [missing[i:i + KOSIS_YEAR_BATCH] for i in range(0, len(missing), KOSIS_YEAR_BATCH)]
+    jobs = [(g, yb[0], yb[-1]) for yb in year_batches for g in gu_batches]
+    with ThreadPoolExecutor(max_workers=KOSIS_MAX_WORKERS, thread_name_prefix="kosis",
+                            initializer=script_ctx_initializer()) as ex:
+        fetched = [r for part in ex.map(lambda j: kosis_request(tbl_id, *j), jobs) for r in part]
+
+    missing_set = set(missing)
+    by_year: Dict[int, list] = {}
+    for r in fetched:
+        y = int(str(r.get("PRD_DE", "0"))[:4])
+        if y in missing_set:   # 연도 구간 요청에 섞인 캐시 보유 연도 제외
+            by_year.setdefault(y, []).append(r)
+    for y, part in by_year.items():
+        if len({r.get("C1") for r in part}) >= len(SEOUL_GU_CODES):
+            atomic_write_bytes(kosis_cache_path(tbl_id, y), json.dumps(part, ensure_ascii=False).encode("utf-8"))
+        rows.extend(part)
+    return rows
+
+def kosis_rows_to_components(rows: list) -> pd.DataFrame:
+    """
+    KOSIS 원자료(C1=구 코드, C2_NM=연령구간, ITM_NM=항목, PRD_DE=연도, DT=값) →
+    [연도, 자치구, 여성20_39, 고령65_이상, 총인구] (연령구간은 코드가 아니라 이름의 시작 연령으로 분류)
+    """
+    raw = pd.DataFrame.from_records(rows)
+    if raw.empty:
+        return pd.DataFrame(columns=["연도", "자치구", "여성20_39", "고령65_이상", "총인구"])
+    raw["연도"] = raw["PRD_DE"].astype(str).str[:4].astype(int)
+    raw["자치구"] = raw["C1"].astype(str).map(SEOUL_GU_CODES).fillna(raw.get("C1_NM"))
+    raw["값"] = pd.to_numeric(raw["DT"], errors="coerce")
+    age_start = pd.to_numeric(raw["C2_NM"].astype(str).str.extract(r"(\d+)")[0], errors="coerce")
+    is_all_ages = raw["C2_NM"].astype(str).str.contains("계")
+    is_female = raw["ITM_NM"].astype(str).str.contains("여")
+    is_total = ~is_female & ~raw["ITM_NM"].astype(str).str.contains("남")
+
+    parts = {
+        "여성20_39": raw[is_female & ~is_all_ages & age_start.between(20, 35)],
+        "고령65_이상": raw[is_total & ~is_all_ages & (age_start >= 65)],
+        "총인구": raw[is_total & is_all_ages],
+    }
+    out = pd.concat(
+        {k: v.groupby(["연도", "자치구"])["값"].sum() for k, v in parts.items()}, axis=1
+    ).reset_index()
+    return out.dropna(subset=["여성20_39", "고령65_이상"]).sort_values(["연도", "자치구"]).reset_index(drop=True)
+
+def fetch_kosis_population() -> pd.DataFrame:
+    years = list(range(KOSIS_START_YEAR, TODAY.year + 1))
+    return kosis_rows_to_components(fetch_kosis_raw_rows(KOSIS_POP_TBL_ID, years))
+
+# ---------------------------
+# SGIS 경계 (토큰 캐시 + UTM-K → WGS84 벡터 변환)
+# ---------------------------
+class SgisTokenCache:
+    """SGIS accessToken을 만료 SGIS_TOKEN_MARGIN_SEC 전까지 프로세스 전체에서 재사용."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.token: str | None = None
+        self.expires_at = 0.0
+
+    def get(self, force_refresh: bool = False) -> str:
+        with self.lock:
+            if force_refresh or not self.token or time.time() >= self.expires_at - SGIS_TOKEN_MARGIN_SEC:
+                self.token, self.expires_at = request_sgis_token()
+            return self.token
+
+@st.cache_resource(show_spinner=False)
+def sgis_token_cache() -> SgisTokenCache:
+    return SgisTokenCache()
+
+def request_sgis_token() -> Tuple[str, float]:
+    """반환: (accessToken, 만료 시각(epoch 초))"""
+    js = http_get(SGIS_AUTH_URL, "geojson",
+                  params={"consumer_key": SGIS_ACCESS_KEY, "consumer_secret": SGIS_SECRET_KEY}).json()
+    if int(js.get("errCd", -1)) != 0:
+        raise RuntimeError(f"SGIS 인증 실패: {js.get('errMsg')}")
+    result = js["result"]
+    try:
+        expires = float(result.get("accessTimeout"))
+        expires = expires / 1000.0 if expires > 1e11 else expires   # ms/초 단위 모두 허용
+    except (TypeError, ValueError):
+        expires = time.time() + 600
+    return result["accessToken"], expires
+
+def utmk_to_wgs84(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """UTM-K(EPSG:5179) → WGS84 경위도. 역 횡메르카토르(Snyder) 공식을 배열 단위로 계산."""
+    a, e2, k0 = UTMK_A, UTMK_F * (2 - UTMK_F), UTMK_K0
+    ep2 = e2 / (1 - e2)
+
+    def meridian_arc(phi):
+        return a * ((1 - e2/4 - 3*e2**2/64 - 5*e2**3/256) * phi
+                    - (3*e2/8 + 3*e2**2/32 + 45*e2**3/1024) * np.sin(2*phi)
+                    + (15*e2**2/256 + 45*e2**3/1024) * np.sin(4*phi)
+                    - (35*e2**3/3072) * np.sin(6*phi))
+
+    m = meridian_arc(np.radians(UTMK_LAT0)) + (np.asarray(y, dtype=float) - UTMK_FN) / k0
+    mu = m / (a * (1 - e2/4 - 3*e2**2/64 - 5*e2**3/256))
+    e1 = (1 - np.sqrt(1 - e2)) / (1 + np.sqrt(1 - e2))
+    phi1 = (mu + (3*e1/2 - 27*e1**3/32) * np.sin(2*mu)
+            + (21*e1**2/16 - 55*e1**4/32) * np.sin(4*mu)
+            + (151*e1**3/96) * np.sin(6*mu)
+            + (1097*e1**4/512) * np.sin(8*mu))
+    sin1, cos1, tan1 = np.sin(phi1), np.cos(phi1), np.tan(phi1)
+    c1 = ep2 * cos1**2
+    t1 = tan1**2
+    n1 = a / np.sqrt(1 - e2 * sin1**2)
+    r1 = a * (1 - e2) / (1 - e2 * sin1**2) ** 1.5
+    d = (np.asarray(x, dtype=float) - UTMK_FE) / (n1 * k0)
+    lat = phi1 - (n1 * tan1 / r1) * (
+        d**2/2 - (5 + 3*t1 + 10*c1 - 4*c1**2 - 9*ep2) * d**4/24
+        + (61 + 90*t1 + 298*c1 + 45*t1**2 - 252*ep2 - 3*c1**2) * d**6/720)
+    lon = np.radians(UTMK_LON0) + (
+        d - (1 + 2*t1 + c1) * d**3/6
+        + (5 - 2*c1 + 28*t1 - 3*c1**2 + 8*ep2 + 24*t1**2) * d**5/120) / cos1
+    return np.degrees(lon), np.degrees(lat)
+
+def geojson_to_wgs84(gj: dict) -> dict:
+    """모든 Polygon/MultiPolygon 링 좌표를 한 배열로 모아 1회 변환 후 원래 구조로 되돌림(in-place)."""
+    rings = []
+    for feat in gj.get("features", []):
+        geom = feat.get("geometry") or {}
+        polys = [geom.get("coordinates", [])] if geom.get("type") == "Polygon" else geom.get("coordinates", [])
+        for poly in polys:
+            rings.extend(poly)
+    if not rings:
+        return gj
+    arrays = [np.asarray(r, dtype=float)[:, :2] for r in rings]
+    xy = np.concatenate(arrays)
+    lon, lat = utmk_to_wgs84(xy[:, 0], xy[:, 1])
+    ll = np.column_stack([lon, lat]).round(6)
+    offsets = np.cumsum([0] + [len(r) for r in arrays])
+    for ring, start, end in zip(rings, offsets[:-1], offsets[1:]):
+        ring[:] = ll[start:end].tolist()
+    return gj
+
+def load_sgis_boundaries() -> dict:
+    """
+    서울시(adm_cd=11) 하위 1단계(low_search=1 → 자치구) 경계를 한 번의 요청으로 조회.
+    토큰 만료(-401) 시 1회 재발급 후 재시도. 자치구명은 SIG_KOR_NM/name 속성으로 정규화.
+    """
+    tokens = sgis_token_cache()
+    for attempt in range(2):
+        params = {"accessToken": tokens.get(force_refresh=attempt > 0), "year": SGIS_BOUNDARY_YEAR,
+                  "adm_cd": "11", "low_search": "1"}
+        gj = http_get(SGIS_BOUNDARY_URL, "geojson", params=params).json()
+        if str(gj.get("errCd", 0)) == "-401":
+            continue
+        break
+    if not gj.get("features"):
+        raise RuntimeError(f"SGIS 경계 조회 실패: {gj.get('errMsg')}")
+    for feat in gj["features"]:
+        props = feat.setdefault("properties", {})
+        gu = str(props.get("adm_nm", "")).split()[-1] if props.get("adm_nm") else None
+        if gu:
+            props["SIG_KOR_NM"] = gu
+            props["name"] = gu
+    return geojson_to_wgs84(gj)
+
+# ---------------------------
+# 데이터 로딩 (캐시)
+# ---------------------------
 def fetch_seoul_geojson() -> Tuple[dict, str]:
+    """서울시 자치구 경계(GeoJSON). 슬롯/디스크 캐시 → 네트워크(fetch_seoul_geojson_network). 반환: (geojson_dict, source_label)"""
+    gj, label, _, _, _ = get_source(
+        "seoul_geojson", lambda: (*fetch_seoul_geojson_network(), TODAY.strftime("%Y-%m-%d"))
+    )
+    return gj, label
+
+def fetch_closed_schools() -> Tuple[pd.DataFrame, str, str]:
+    """서울시 폐교 현황. 슬롯/디스크 캐시 → 네트워크(fetch_closed_schools_network). 반환: (원자료 df, source_label, collected_date_str)"""
+    df, label, collected, _, _ = get_source("closed_schools", fetch_closed_schools_network)
+    return df, label, collected
+
+def fetch_population_components() -> Tuple[pd.DataFrame, str, str]:
+    """인구소멸지표 구성요소. 슬롯/디스크 캐시 → 네트워크(fetch_population_components_network). 반환: (원자료 df, source_label, collected_date_str)"""
+    df, label, collected, _, _ = get_source("population", fetch_population_components_network)
+    return df, label, collected
+
+def fetch_seoul_geojson_network() -> Tuple[dict, str]:
     """
     서울시 자치구 경계(GeoJSON)
-    1순위: SGIS/API (인증 필요) -> 구현 자리(키 필요, 서비스에 따라 경로 상이)
+    1순위: SGIS OpenAPI3 (SGIS_ACCESS_KEY/SGIS_SECRET_KEY 필요) → 자치구 경계, WGS84 변환
     2순위: data.go.kr의 행정경계(다운로드형) → 직접 URL 제공 시 파싱
     3순위: 공개 백업(비공식, 단순화 GeoJSON) Fallback
 
     반환: (geojson_dict, source_label)
     """
-    # --- 1) SGIS 공식 API (샘플 구조) ---
+    candidates = []
+    # --- 1) SGIS 공식 API (토큰 캐시, 자치구 경계 1회 요청, UTM-K → WGS84) ---
     # 문서: https://sgis.kostat.go.kr (인증 후 사용)
-    # if SGIS_ACCESS_KEY and SGIS_SECRET_KEY:
-    #     try:
-    #         # 실제 구현 시: 토큰 발급 → 경계 API 호출 → 서울시 자치구 레벨(시군구) GeoJSON 취득
-    #         # 아래는 구조 예시(동작 X)
-    #         token = "<get_token_with_sgis>"
-    #         url = "<sgis-geojson-endpoint-for-seoul-districts>"
-    #         r = requests.get(url, headers={"Authorization": f"Bearer {token}"}, timeout=20)
-    #         r.raise_for_status()
-    #         gj = r.json()
-    #         return gj, "SGIS(공식)"
-    #     except Exception:
-    #         pass
+    if SGIS_ACCESS_KEY and SGIS_SECRET_KEY:
+        candidates.append(("SGIS(공식)", load_sgis_boundaries))
 
     # --- 2) data.go.kr 공식 파일 (사용자가 URL 주입/설정 시) ---
     data_go_kr_geojson_url = os.environ.get("SEOUL_GEOJSON_URL", "")
     if data_go_kr_geojson_url:
-        try:
-            r = requests.get(data_go_kr_geojson_url, timeout=20)
-            r.raise_for_status()
-            gj = r.json()
-            return gj, "data.go.kr(공식)"
-        except Exception:
-            pass
+        candidates.append(("data.go.kr(공식)", lambda: load_geojson_url(data_go_kr_geojson_url)))
 
     # --- 3) Fallback: 공개 저장소(비공식) 단순화 GeoJSON ---
+    candidates.append(("대체(비공식) GitHub", lambda: load_geojson_url(GITHUB_GEOJSON_URL)))
+
+    # 상위 출처가 느리면 다음 출처를 병렬로 시작(헤지)
+    won = hedged_first(candidates)
+    if won is not None:
+        return won
+
+    # 마지막 방어선: 매우 단순한 placeholder GeoJSON
+    placeholder = {
+        "type": "FeatureCollection",
+        "features": []
+    }
+    return placeholder, "내장 예시(경계 없음)"
+
+def load_geojson_url(url: str) -> dict:
+    """GeoJSON 다운로드(조건부 GET) + 최소 유효성 검사(피처 없는 응답은 실패로 간주 → 다음 출처)."""
+    gj, _ = conditional_get(url, "geojson", lambda r: r.json())
+    if not isinstance(gj, dict) or not gj.get("features"):
+        raise ValueError(f"유효한 FeatureCollection 아님: {url}")
+    return gj
+
+def find_sido_col(columns) -> str | None:
+    possible_sido_cols = [c for c in columns if "시도" in c or "광역" in c or "시도명" in c]
+    return possible_sido_cols[0] if possible_sido_cols else None
+
+def filter_seoul_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """시도 컬럼이 있으면 서울 행만 남김."""
+    col = find_sido_col(df.columns)
+    if col:
+        df = df[df[col].astype(str).str.contains("서울")]
+    return df.reset_index(drop=True)
+
+def is_closed_school_column(col) -> bool:
+    """
+    폐교 원자료에서 다운스트림(학교명/폐교연도/위도/경도/자치구)에 쓰이는 컬럼과
+    그 동의어(build_closed_agg의 '구'/'연도'/'년도' 탐색 규칙), 지역 필터용 시도 컬럼만 선택.
+    """
+    c = str(col)
+    return (c in CLOSED_SCHOOL_COLUMNS or find_sido_col([c]) is not None
+            or any(k in c for k in ("학교명", "구", "연도", "년도", "위도", "경도")))
+
+def read_closed_csv_streaming(r: requests.Response) -> pd.DataFrame:
+    """
+    스트리밍 응답(stream=True)을 CSV_CHUNK_ROWS 행씩 읽으면서
+    청크마다 필요한 컬럼만 파싱(usecols)하고 서울 행만 남김.
+    전국 파일 전체를 메모리에 올리지 않음.
+    """
     try:
-        url = "https://raw.githubusercontent.com/southkorea/seoul-maps/master/json/seoul_municipalities_geo_simple.json"
-        r = requests.get(url, timeout=20)
-        r.raise_for_status()
-        return r.json(), "대체(비공식) GitHub"
-    except Exception:
-        # 마지막 방어선: 매우 단순한 placeholder GeoJSON
-        placeholder = {
-            "type": "FeatureCollection",
-            "features": []
-        }
-        return placeholder, "내장 예시(경계 없음)"
+        r.raw.decode_content = True   # gzip 등 전송 인코딩 해제
+        parts, template, sido_col = [], None, None
+        for chunk in pd.read_csv(r.raw, chunksize=CSV_CHUNK_ROWS, usecols=is_closed_school_column):
+            if template is None:
+                template = chunk.iloc[:0]
+                sido_col = find_sido_col(chunk.columns)
+            if sido_col:
+                chunk = chunk[chunk[sido_col].astype(str).str.contains("서울", regex=False)]
+            if not chunk.empty:
+                parts.append(chunk)
+    finally:
+        r.close()
+    if not parts:
+        return template if template is not None else pd.DataFrame(columns=CLOSED_SCHOOL_COLUMNS)
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+
+def data_go_rows(js: dict) -> list:
+    """data.go.kr 응답의 행 목록. odcloud형(data/items)과 공공데이터포털 표준형(response.body.items.item) 모두 지원."""
+    if "data" in js or "items" in js:
+        rows = js.get("data", js.get("items", []))
+    else:
+        rows = js.get("response", {}).get("body", {}).get("items", {})
+        rows = rows.get("item", []) if isinstance(rows, dict) else rows
+    return [rows] if isinstance(rows, dict) else list(rows or [])
 
-@st.cache_data(show_spinner=False, ttl=60*30)
-def fetch_closed_schools() -> Tuple[pd.DataFrame, str, str]:
+def data_go_total_count(js: dict) -> int:
+    body = js.get("response", {}).get("body", {}) if "response" in js else js
+    try:
+        return int(body.get("totalCount") or body.get("matchCount") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def data_go_page_params(params: dict, standard: bool, page: int) -> dict:
+    """페이지 요청 파라미터. 표준형(response.body)은 pageNo/numOfRows만 인식, odcloud형은 page/perPage."""
+    if not standard:
+        return {**params, "page": page}
+    base = {k: v for k, v in params.items() if k not in ("page", "perPage")}
+    return {**base, "pageNo": page, "numOfRows": params["perPage"]}
+
+def collect_data_go_pages(url: str, source: str, params: dict, first_js: dict) -> pd.DataFrame:
+    """
+    1페이지 응답(first_js)의 totalCount로 전체 페이지 수를 정하고 2페이지부터 병렬 수집.
+    표준형 응답이면 pageNo/numOfRows로 다시 요청(1페이지 요청의 page/perPage는 무시되어 기본 크기로 응답됨).
+    페이지별 레코드 → DataFrame(열 단위 배열) 후 한 번에 concat (행 단위 json_normalize 없음).
+    """
+    per_page = int(params["perPage"])
+    standard = "response" in first_js
+    n_pages = max(1, math.ceil(data_go_total_count(first_js) / per_page))
+
+    def fetch_page(page: int) -> pd.DataFrame:
+        js = http_get(url, source, params=data_go_page_params(params, standard, page)).json()
+        return pd.DataFrame.from_records(data_go_rows(js))
+
+    body = first_js.get("response", {}).get("body", {}) if standard else {}
+    first_ok = not standard or (str(body.get("numOfRows")) == str(per_page) and str(body.get("pageNo")) == "1")
+    frames = [pd.DataFrame.from_records(data_go_rows(first_js)) if first_ok else fetch_page(1)]
+
+    if n_pages > 1:
+        with ThreadPoolExecutor(max_workers=max(1, min(DATA_GO_MAX_WORKERS, n_pages - 1)),
+                                thread_name_prefix="data-go-page",
+                                initializer=script_ctx_initializer()) as ex:
+            frames.extend(ex.map(fetch_page, range(2, n_pages + 1)))  # 페이지 순서 유지
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+def fetch_data_go_paginated(url: str, source: str,
+                            transform: Callable[[pd.DataFrame], pd.DataFrame] = lambda df: df) -> pd.DataFrame:
+    """
+    page/perPage(표준형은 pageNo/numOfRows) + totalCount 페이지네이션 JSON API 전체 수집.
+    1페이지는 조건부 GET → 304면 이전에 합쳐 둔 전체 결과(transform 적용 후)를 그대로 재사용.
+    """
+    params = {"serviceKey": DATA_GO_KEY, "page": 1, "perPage": DATA_GO_PER_PAGE}
+    df, _ = conditional_get(url, source,
+                            lambda r: transform(collect_data_go_pages(url, source, params, r.json())),
+                            params=params)
+    return df
+
+def load_closed_from_data_go(endpoint: str) -> pd.DataFrame:
+    if endpoint.lower().endswith(".csv"):
+        df, _ = conditional_get(endpoint, "closed_schools", read_closed_csv_streaming, stream=True)
+    else:
+        df = fetch_data_go_paginated(endpoint, "closed_schools", transform=filter_seoul_rows)
+    return df
+
+def load_closed_from_keis(keis_url: str) -> pd.DataFrame:
+    # 확장자와 무관하게 CSV 응답으로 간주(기존 동작) → 스트리밍 파싱
+    df, _ = conditional_get(keis_url, "closed_schools", read_closed_csv_streaming, stream=True)
+    return df
+
+def fetch_closed_schools_network() -> Tuple[pd.DataFrame, str, str]:
     """
     서울시 폐교 현황 (구별)
     1) data.go.kr '폐교 현황' 데이터셋 API/파일 시도 (키 필요)
@@ -169,41 +1063,19 @@ def fetch_closed_schools() -> Tuple[pd.DataFrame, str, str]:
     반환: (원자료 df, source_label, collected_date_str)
     """
     collected_date = TODAY.strftime("%Y-%m-%d")
+    candidates = []
     endpoint = os.environ.get("DATA_GO_CLOSED_SCHOOL_URL", "")
-    try:
-        if endpoint:
-            if endpoint.lower().endswith(".csv"):
-                df = pd.read_csv(endpoint)
-            else:
-                r = requests.get(endpoint, params={"serviceKey": DATA_GO_KEY}, timeout=20)
-                r.raise_for_status()
-                js = r.json()
-                rows = js.get("data", js.get("items", []))
-                df = pd.json_normalize(rows)
-            possible_sido_cols = [c for c in df.columns if "시도" in c or "광역" in c or "시도명" in c]
-            if possible_sido_cols:
-                col = possible_sido_cols[0]
-                df = df[df[col].astype(str).str.contains("서울")]
-            return df.reset_index(drop=True), "data.go.kr(공식)", collected_date
-    except Exception:
-        pass
-
+    if endpoint:
+        candidates.append(("data.go.kr(공식)", lambda: load_closed_from_data_go(endpoint)))
     keis_url = os.environ.get("KEIS_CLOSED_SCHOOL_URL", "")
-    try:
-        if keis_url:
-            if keis_url.lower().endswith(".csv"):
-                df = pd.read_csv(keis_url)
-            else:
-                r = requests.get(keis_url, timeout=20)
-                r.raise_for_status()
-                df = pd.read_csv(io.StringIO(r.text))
-            possible_sido_cols = [c for c in df.columns if "시도" in c or "광역" in c or "시도명" in c]
-            if possible_sido_cols:
-                col = possible_sido_cols[0]
-                df = df[df[col].astype(str).str.contains("서울")]
-            return df.reset_index(drop=True), "KEIS/교육부(공식)", collected_date
-    except Exception:
-        pass
+    if keis_url:
+        candidates.append(("KEIS/교육부(공식)", lambda: load_closed_from_keis(keis_url)))
+
+    # data.go.kr → KEIS 체인도 헤지 방식으로 경쟁
+    won = hedged_first(candidates)
+    if won is not None:
+        df, label = won
+        return df, label, collected_date
 
     example = [
         ["구의초등학교(예시)", 2002, 37.537, 127.091, "광진구"],
@@ -216,8 +1088,7 @@ def fetch_closed_schools() -> Tuple[pd.DataFrame, str, str]:
     df = pd.DataFrame(example, columns=["학교명","폐교연도","위도","경도","자치구"])
     return df, "내장 예시", collected_date
 
-@st.cache_data(show_spinner=False, ttl=60*30)
-def fetch_population_components() -> Tuple[pd.DataFrame, str, str]:
+def fetch_population_components_network() -> Tuple[pd.DataFrame, str, str]:
     """
     인구소멸지표 구성요소:
       - 20–39세 여성 인구 (분자 또는 분모)
@@ -231,7 +1102,9 @@ def fetch_population_components() -> Tuple[pd.DataFrame, str, str]:
 
     if KOSIS_API_KEY:
         try:
-            pass
+            df = fetch_kosis_population()
+            if not df.empty:
+                return df, "KOSIS(공식)", collected_date
         except Exception:
             pass
 
@@ -239,13 +1112,9 @@ def fetch_population_components() -> Tuple[pd.DataFrame, str, str]:
     if pop_url:
         try:
             if pop_url.lower().endswith(".csv"):
-                df = pd.read_csv(pop_url)
+                df, _ = conditional_get(pop_url, "population", lambda r: pd.read_csv(io.BytesIO(r.content)))
             else:
-                r = requests.get(pop_url, params={"serviceKey": DATA_GO_KEY}, timeout=30)
-                r.raise_for_status()
-                js = r.json()
-                rows = js.get("data", js.get("items", []))
-                df = pd.json_normalize(rows)
+                df = fetch_data_go_paginated(pop_url, "population")
             return df, "data.go.kr(공식)", collected_date
         except Exception:
             pass
@@ -267,55 +1136,419 @@ def fetch_population_components() -> Tuple[pd.DataFrame, str, str]:
     df = pd.DataFrame(records, columns=["연도","자치구","여성20_39","고령65_이상","총인구"])
     return df, "내장 예시", collected_date
 
+def load_sources_concurrently() -> Tuple[Tuple[dict, str], Tuple[pd.DataFrame, str, str], Tuple[pd.DataFrame, str, str]]:
+    """
+    경계/폐교/인구 3개 출처를 스레드 풀에서 동시에 로딩.
+    콜드 캐시 기준 첫 화면 지연 = (세 출처 지연의 합) → (가장 느린 단일 출처 지연).
+    각 fetcher는 내부에서 대체 출처/예시 데이터로 전환하므로 결과는 항상 채워짐.
+
+    반환: ((geojson, source_label), (폐교 df, source_label, collected_date), (인구 df, source_label, collected_date))
+    """
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="source-loader",
+                            initializer=script_ctx_initializer()) as ex:
+        f_geo = ex.submit(fetch_seoul_geojson)
+        f_closed = ex.submit(fetch_closed_schools)
+        f_pop = ex.submit(fetch_population_components)
+        return f_geo.result(), f_closed.result(), f_pop.result()
+
 # ---------------------------
 # 도형 유틸 (구 중심 추정)
 # ---------------------------
-def feature_centroid(feature: dict) -> Tuple[float, float] | None:
+def flatten_polygon_rings(features: List[dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
-    GeoJSON Feature의 중심좌표(경도, 위도) 추정 (geopandas 없이)
-    Polygon/MultiPolygon의 모든 좌표 평균을 사용(면적 가중치 없음 → 근사치).
+    Polygon/MultiPolygon 피처들의 모든 링을 한 번에 평탄화.
+    반환: (xy (V,2), ring_offsets (R+1,), ring_feature (R,) 피처 인덱스, ring_is_hole (R,))
+    꼭짓점 3개 미만 링은 제외.
     """
-    try:
-        geom = feature.get("geometry", {})
+    arrays, ring_feature, ring_is_hole = [], [], []
+    for fi, feat in enumerate(features):
+        geom = (feat or {}).get("geometry") or {}
         gtype = geom.get("type", "")
         coords = geom.get("coordinates", [])
-        xs, ys, n = 0.0, 0.0, 0
-        def add_coords(crds):
-            nonlocal xs, ys, n
-            for (x, y) in crds:
-                xs += float(x); ys += float(y); n += 1
-
-        if gtype == "Polygon":
-            for ring in coords:
-                add_coords(ring)
-        elif gtype == "MultiPolygon":
-            for poly in coords:
-                for ring in poly:
-                    add_coords(ring)
-        if n == 0:
-            return None
-        return xs/n, ys/n
-    except Exception:
-        return None
+        polys = [coords] if gtype == "Polygon" else coords if gtype == "MultiPolygon" else []
+        for poly in polys:
+            for ri, ring in enumerate(poly):
+                arr = np.asarray(ring, dtype=float)
+                if arr.ndim != 2 or len(arr) < 3:
+                    continue
+                arrays.append(arr[:, :2])
+                ring_feature.append(fi)
+                ring_is_hole.append(ri > 0)   # GeoJSON: 첫 링=외곽, 이후=구멍
+    if not arrays:
+        return np.empty((0, 2)), np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(a) for a in arrays], out=offsets[1:])
+    return np.concatenate(arrays), offsets, np.asarray(ring_feature, dtype=np.int64), np.asarray(ring_is_hole)
+
+def polygon_centroids_flat(xy: np.ndarray, offsets: np.ndarray, ring_feature: np.ndarray,
+                           ring_is_hole: np.ndarray, n: int) -> np.ndarray:
+    """
+    flatten_polygon_rings 결과로 모든 피처의 면적 가중 중심(경도, 위도)을 한 번에 계산 → (F,2), 도형 없는 피처는 NaN.
+    링별 shoelace 면적/1차 모멘트를 np.add.reduceat으로 구하고,
+    외곽 링은 +|A|, 구멍은 −|A| 가중으로 피처(멀티폴리곤 포함)별 합산.
+    면적이 0인 퇴화 도형은 꼭짓점 평균으로 대체.
+    """
+    out = np.full((n, 2), np.nan)
+    if len(ring_feature) == 0:
+        return out
+    starts, lengths = offsets[:-1], np.diff(offsets)
+    # 정밀도 확보: 링 첫 꼭짓점 기준 상대좌표
+    origin = xy[starts]
+    local = xy - np.repeat(origin, lengths, axis=0)
+    x, y = local[:, 0], local[:, 1]
+    nxt = np.arange(len(xy)) + 1
+    nxt[offsets[1:] - 1] = starts           # 링 마지막 꼭짓점 → 첫 꼭짓점
+    cross = x * y[nxt] - x[nxt] * y
+    area2 = np.add.reduceat(cross, starts)                   # 2A (부호 포함)
+    mx = np.add.reduceat((x + x[nxt]) * cross, starts) / 3.0  # 2A·Cx_local
+    my = np.add.reduceat((y + y[nxt]) * cross, starts) / 3.0
+
+    sign = np.where(ring_is_hole, -1.0, 1.0) * np.sign(area2)
+    w = sign * area2                                          # ±2|A|
+    wx = sign * mx + w * origin[:, 0]
+    wy = sign * my + w * origin[:, 1]
+    sw = np.bincount(ring_feature, weights=w, minlength=n)
+    sx = np.bincount(ring_feature, weights=wx, minlength=n)
+    sy = np.bincount(ring_feature, weights=wy, minlength=n)
+
+    vert_feature = np.repeat(ring_feature, lengths)
+    cnt = np.bincount(vert_feature, minlength=n)
+    mean_x = np.bincount(vert_feature, weights=xy[:, 0], minlength=n)
+    mean_y = np.bincount(vert_feature, weights=xy[:, 1], minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ok = np.abs(sw) > 1e-18
+        out[:, 0] = np.where(ok, sx / sw, mean_x / cnt)
+        out[:, 1] = np.where(ok, sy / sw, mean_y / cnt)
+    out[cnt == 0] = np.nan
+    return out
 
-def build_gu_centroids(geojson: dict, gu_key_candidates: List[str]) -> Dict[str, Tuple[float,float]]:
-    name_map = {}
-    for feat in geojson.get("features", []):
-        props = feat.get("properties", {})
-        gu_name = None
-        for key in gu_key_candidates:
-            if key in props:
-                gu_name = str(props[key])
-                break
-        if not gu_name:
-            if "name" in props:
-                gu_name = str(props["name"])
-        if not gu_name:
+def feature_gu_name(props: dict, gu_key_candidates: List[str]) -> str | None:
+    for key in gu_key_candidates:
+        if key in props:
+            return str(props[key])
+    if "name" in props:
+        return str(props["name"])
+    return None
+
+def normalize_gu_name(name) -> str:
+    """'서울특별시 종로구' / ' 종로구 ' → '종로구' (공백 기준 마지막 토큰)"""
+    parts = str(name).split()
+    return parts[-1] if parts else ""
+
+def fit_view_state(bbox: np.ndarray | None) -> Dict[str, float]:
+    """전체 경계 bbox [minx, miny, maxx, maxy]가 MAP_VIEWPORT_PX에 들어오는 중심/줌(웹 메르카토르 근사)."""
+    if bbox is None or not np.isfinite(bbox).all():
+        return dict(DEFAULT_VIEW)
+    minx, miny, maxx, maxy = (float(v) for v in bbox)
+    lat_c = (miny + maxy) / 2
+    width, height = MAP_VIEWPORT_PX
+    zoom_x = math.log2(width * 360 / (256 * max(maxx - minx, 1e-6)))
+    zoom_y = math.log2(height * 360 * math.cos(math.radians(lat_c)) / (256 * max(maxy - miny, 1e-6)))
+    zoom = min(max(min(zoom_x, zoom_y) - 0.3, 3.0), 15.0)
+    return {"latitude": lat_c, "longitude": (minx + maxx) / 2, "zoom": round(zoom, 2)}
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def build_geometry_bundle(geo_version: str, _geojson: dict, gu_key_candidates: Tuple[str, ...]) -> dict:
+    """
+    geojson 버전(내용 해시)별로 1회만 계산되는 도형 파생 정보(매 rerun은 캐시 조회).
+      feature_names : 피처별 정규화 구 이름(없으면 None)
+      gu_centroids  : 구 이름 → (위도, 경도)  (폐교 좌표 대체용)
+      view          : 전체 경계에 맞춘 초기 화면 {latitude, longitude, zoom}
+      xy, ring_offsets, ring_feature, ring_is_hole : flatten_polygon_rings 결과
+    """
+    features = _geojson.get("features", [])
+    n = len(features)
+    xy, offsets, ring_feature, ring_is_hole = flatten_polygon_rings(features)
+    centroids = polygon_centroids_flat(xy, offsets, ring_feature, ring_is_hole, n)
+
+    feature_names, gu_centroids = [], {}
+    for i, feat in enumerate(features):
+        raw = feature_gu_name((feat or {}).get("properties", {}) or {}, list(gu_key_candidates))
+        name = normalize_gu_name(raw) if raw else None
+        feature_names.append(name)
+        if name and np.isfinite(centroids[i]).all():
+            gu_centroids.setdefault(name, (float(centroids[i, 1]), float(centroids[i, 0])))
+
+    total_bbox = None
+    if len(xy):
+        total_bbox = np.array([xy[:, 0].min(), xy[:, 1].min(), xy[:, 0].max(), xy[:, 1].max()])
+    return {
+        "feature_names": feature_names,
+        "gu_centroids": gu_centroids,
+        "view": fit_view_state(total_bbox),
+        "xy": xy,
+        "ring_offsets": offsets,
+        "ring_feature": ring_feature,
+        "ring_is_hole": ring_is_hole,
+    }
+
+def boundary_topology(xy: np.ndarray, offsets: np.ndarray) -> dict:
+    """
+    평탄화 링(flatten_polygon_rings) → 공유 호(arc) 위상. 인접 구가 공유하는 경계는 호 1개로 저장.
+    - 좌표를 VERTEX_SNAP_DECIMALS 자리로 맞춰 같은 꼭짓점을 같은 id로 식별
+    - 접점: 등장 위치마다 이웃(이전·다음) 쌍이 다른 꼭짓점 = 경계가 갈라지는 지점
+    - 링을 접점에서 잘라 호로 만들고, 방향과 무관한 정규형으로 중복 제거
+      (접점 없는 링(섬, 통째로 공유되는 링)은 최소 id에서 시작하는 닫힌 호 1개)
+    반환: verts (V,2), arcs (꼭짓점 id 배열 목록), ring_arcs (링별 호 참조, ~i = 역방향)
+    """
+    n_rings = len(offsets) - 1
+    if n_rings <= 0 or len(xy) == 0:
+        return {"verts": np.empty((0, 2)), "arcs": [], "ring_arcs": []}
+    starts, ends = offsets[:-1], offsets[1:]
+    closed = np.all(xy[ends - 1] == xy[starts], axis=1)   # GeoJSON 닫는 꼭짓점 제거
+    keep = np.ones(len(xy), dtype=bool)
+    keep[(ends - 1)[closed]] = False
+    pts = xy[keep]
+    ring_len = np.diff(offsets) - closed
+    ring_start = np.concatenate([[0], np.cumsum(ring_len)[:-1]])
+
+    snapped = np.round(pts * 10**VERTEX_SNAP_DECIMALS).astype(np.int64)
+    _, first, vid = np.unique(snapped, axis=0, return_index=True, return_inverse=True)
+    vid = vid.ravel()
+    verts = pts[first]
+
+    idx = np.arange(len(pts))
+    ring_of = np.repeat(np.arange(n_rings), ring_len)
+    local = idx - ring_start[ring_of]
+    prev = np.where(local == 0, idx + ring_len[ring_of] - 1, idx - 1)
+    nxt = np.where(local == ring_len[ring_of] - 1, ring_start[ring_of], idx + 1)
+    pairs = np.stack([vid, np.minimum(vid[prev], vid[nxt]), np.maximum(vid[prev], vid[nxt])], axis=1)
+    uniq_pairs = np.unique(pairs, axis=0)
+    junction = np.bincount(uniq_pairs[:, 0], minlength=len(verts)) > 1
+
+    arcs, ring_arcs, arc_index = [], [], {}
+    for r in range(n_rings):
+        ids = vid[ring_start[r]:ring_start[r] + ring_len[r]]
+        k = len(ids)
+        cut = np.flatnonzero(junction[ids])
+        if len(cut) == 0:
+            seq = np.roll(ids, -int(np.argmin(ids)))
+            segs = [np.append(seq, seq[0])]
+        else:
+            rolled = np.roll(ids, -int(cut[0]))
+            bounds = np.append(cut - cut[0], k)
+            segs = [np.append(rolled[a:b], rolled[b % k]) for a, b in zip(bounds[:-1], bounds[1:])]
+        refs = []
+        for seq in segs:
+            fwd, rev = seq.tobytes(), seq[::-1].tobytes()
+            flipped = rev < fwd
+            key = rev if flipped else fwd
+            i = arc_index.get(key)
+            if i is None:
+                i = arc_index[key] = len(arcs)
+                arcs.append(seq[::-1] if flipped else seq)
+            refs.append(~i if flipped else i)
+        ring_arcs.append(refs)
+    return {"verts": verts, "arcs": arcs, "ring_arcs": ring_arcs}
+
+def douglas_peucker_mask(p: np.ndarray, tol: float) -> np.ndarray:
+    """
+    끝점 고정 Douglas–Peucker 유지 마스크(반복 스택, 구간 거리는 배열 연산).
+    3점 이상이면 최원점은 항상 유지 → 닫힌 호/짧은 링이 선분으로 붕괴하지 않음.
+    """
+    n = len(p)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack, first = [(0, n - 1)], True
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
             continue
-        c = feature_centroid(feat)
-        if c:
-            name_map[gu_name] = (c[1], c[0])  # (lat, lon)
-    return name_map
+        seg = p[b] - p[a]
+        rel = p[a + 1:b] - p[a]
+        length = math.hypot(seg[0], seg[1])
+        if length > 0:
+            d = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / length
+        else:
+            d = np.hypot(rel[:, 0], rel[:, 1])   # 닫힌 호: 시작점으로부터 거리
+        i = int(np.argmax(d))
+        if first or d[i] > tol:
+            m = a + 1 + i
+            keep[m] = True
+            stack += [(a, m), (m, b)]
+        first = False
+    return keep
+
+def assemble_ring(arc_pts: List[np.ndarray], refs: List[int]) -> np.ndarray:
+    """호 참조 목록 → 닫힌 링 좌표(이어지는 호의 첫 점은 중복이므로 생략)."""
+    parts = []
+    for j, ref in enumerate(refs):
+        a = arc_pts[ref] if ref >= 0 else arc_pts[~ref][::-1]
+        parts.append(a if j == 0 else a[1:])
+    return np.concatenate(parts)
+
+def rings_to_geometries(rings: List[np.ndarray], ring_feature: np.ndarray, ring_is_hole: np.ndarray,
+                        n: int, decimals: int) -> List[dict | None]:
+    """링 목록 → 피처별 Polygon/MultiPolygon(외곽 링마다 새 폴리곤, 뒤따르는 구멍은 그 폴리곤에 귀속)."""
+    polys: List[list] = [[] for _ in range(n)]
+    for ring, fi, hole in zip(rings, ring_feature, ring_is_hole):
+        coords = np.round(ring, decimals).tolist()
+        if hole and polys[fi]:
+            polys[fi][-1].append(coords)
+        else:
+            polys[fi].append([coords])
+    return [None if not p else {"type": "Polygon", "coordinates": p[0]} if len(p) == 1
+            else {"type": "MultiPolygon", "coordinates": p} for p in polys]
+
+def tier_tolerance(max_zoom: float, lat0: float) -> float:
+    """최대 줌에서 SIMPLIFY_TOLERANCE_PX 픽셀에 해당하는 거리(경도×cos(위도)/위도 평면 단위)."""
+    return SIMPLIFY_TOLERANCE_PX * 360 * math.cos(math.radians(lat0)) / (256 * 2**max_zoom)
+
+def pick_boundary_tier(zoom: float) -> str:
+    """화면 줌을 담당하는 가장 거친 단계(가장 높은 줌 초과 시 detail)."""
+    return next((t for t, z in SIMPLIFY_TIERS.items() if zoom <= z), list(SIMPLIFY_TIERS)[-1])
+
+def delta_encode_arcs(arcs_q: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    양자화 호 목록 → (호 오프셋 (A+1,), 델타 (K,2) int32).
+    호마다 첫 점은 절대 격자 좌표, 이후는 직전 점과의 차. 격자상 연속 중복점(내부)은 제거.
+    """
+    parts = []
+    for q in arcs_q:
+        dup = np.zeros(len(q), dtype=bool)
+        if len(q) > 2:
+            dup[1:-1] = np.all(q[1:-1] == q[:-2], axis=1)
+        q = q[~dup]
+        parts.append(np.diff(q, axis=0, prepend=np.zeros((1, 2), dtype=q.dtype)))
+    offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    np.cumsum([len(d) for d in parts], out=offsets[1:])
+    deltas = np.concatenate(parts).astype(np.int32) if parts else np.empty((0, 2), dtype=np.int32)
+    return offsets, deltas
+
+def decode_arcs(offsets: np.ndarray, deltas: np.ndarray, transform: dict) -> List[np.ndarray]:
+    """delta_encode_arcs 역변환: 호별 누적합(전체 cumsum에서 호 시작 직전 누적값 차감) → 경위도."""
+    if len(deltas) == 0:
+        return [np.empty((0, 2)) for _ in range(len(offsets) - 1)]
+    cs = np.cumsum(deltas, axis=0, dtype=np.int64)
+    base = np.vstack([np.zeros((1, 2), dtype=np.int64), cs])[offsets[:-1]]
+    q = cs - np.repeat(base, np.diff(offsets), axis=0)
+    xy = q * transform["scale"] + transform["translate"]
+    return np.split(xy, offsets[1:-1])
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_boundary_tiers(geo_version: str, _geojson: dict) -> dict:
+    """
+    geojson 버전별 경계 압축 저장소(세션 공유, 읽기 전용). TopoJSON과 같은 구성:
+      - 공유 호 위상: 인접 구 경계는 호 1개, 링은 호 참조 목록(ring_arcs)
+      - 좌표: BOUNDARY_QUANTIZATION 격자 정수화 + 호 내부 델타 부호화(int32)
+      - 단순화 단계(overview/district/detail)별로 호마다 유지 꼭짓점만 저장,
+        복원 자릿수도 단계 허용오차의 1/10 수준으로 제한(전송 JSON 축소)
+    호 단위 단순화라 인접 구 경계가 같은 꼭짓점으로 줄어듦 → 틈/겹침 없음.
+    pydeck/Plotly용 GeoJSON은 decode_boundary_tier로 렌더 시점에만 복원.
+    """
+    features = _geojson.get("features", [])
+    xy, offsets, ring_feature, ring_is_hole = flatten_polygon_rings(features)
+    topo = boundary_topology(xy, offsets)
+    verts = topo["verts"]
+    lat0 = float(verts[:, 1].mean()) if len(verts) else DEFAULT_VIEW["latitude"]
+    planar = verts * np.array([math.cos(math.radians(lat0)), 1.0])
+
+    lo = verts.min(axis=0) if len(verts) else np.zeros(2)
+    span = (verts.max(axis=0) - lo) if len(verts) else np.ones(2)
+    scale = np.maximum(span, 1e-9) / (BOUNDARY_QUANTIZATION - 1)
+    verts_q = np.round((verts - lo) / scale).astype(np.int64)
+    grid_decimals = max(0, math.ceil(-math.log10(float(scale.min()))))
+
+    tiers = {}
+    for tier, max_zoom in SIMPLIFY_TIERS.items():
+        tol = tier_tolerance(max_zoom, lat0)
+        arc_offsets, deltas = delta_encode_arcs(
+            [verts_q[ids[douglas_peucker_mask(planar[ids], tol)]] for ids in topo["arcs"]]
+        )
+        tiers[tier] = {
+            "arc_offsets": arc_offsets,
+            "deltas": deltas,
+            "decimals": min(grid_decimals, max(0, math.ceil(-math.log10(tol / 10)))),
+        }
+    return {
+        "transform": {"scale": scale, "translate": lo},
+        "ring_arcs": topo["ring_arcs"],
+        "ring_feature": ring_feature,
+        "ring_is_hole": ring_is_hole,
+        "n_features": len(features),
+        "tiers": tiers,
+        "raw_vertices": int(len(xy)),
+    }
+
+def decode_boundary_tier(store: dict, tier: str) -> List[dict | None]:
+    """압축 저장소의 한 단계 → 피처별 GeoJSON geometry(단계별 자릿수로 반올림)."""
+    enc = store["tiers"][tier]
+    arc_pts = decode_arcs(enc["arc_offsets"], enc["deltas"], store["transform"])
+    rings = [assemble_ring(arc_pts, refs) for refs in store["ring_arcs"]]
+    return rings_to_geometries(rings, store["ring_feature"], store["ring_is_hole"],
+                               store["n_features"], decimals=enc["decimals"])
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_district_index(geo_version: str, _bundle: dict) -> dict:
+    """
+    구 경계 점-다각형 판정용 위도 띠(slab) 격자 인덱스. geojson 버전별 1회(세션 공유, 읽기 전용).
+    수평 반직선 교차 판정에는 점의 위도를 가로지르는 변만 필요 → 변을 걸치는 띠마다 등록(띠·피처 순 정렬)하고
+    점은 자기 띠의 변들과만 비교 → 전체 꼭짓점 스캔 없음.
+      edges (E,4) [x0,y0,x1,y1], edge_feature (E,), band_offsets (B+1,), ymin/h 띠 정의, bbox, names
+    """
+    xy, offsets, ring_feature = _bundle["xy"], _bundle["ring_offsets"], _bundle["ring_feature"]
+    names = np.asarray(_bundle["feature_names"], dtype=object)
+    if len(xy) == 0:
+        return {"edges": np.empty((0, 4)), "names": names}
+    lens = np.diff(offsets)
+    nxt = np.arange(1, len(xy) + 1)
+    nxt[offsets[1:] - 1] = offsets[:-1]                     # 링 마지막 → 첫 꼭짓점(열린 링도 닫음)
+    edges = np.hstack([xy, xy[nxt]])
+    feature = np.repeat(ring_feature, lens)
+    sloped = edges[:, 1] != edges[:, 3]                     # 수평 변은 교차하지 않음
+    edges, feature = edges[sloped], feature[sloped]
+
+    ymin, ymax = float(xy[:, 1].min()), float(xy[:, 1].max())
+    h = max(ymax - ymin, 1e-9) / DISTRICT_INDEX_BANDS
+
+    def to_band(y: np.ndarray) -> np.ndarray:
+        return np.clip(np.floor((y - ymin) / h).astype(np.int64), 0, DISTRICT_INDEX_BANDS - 1)
+
+    b_lo = to_band(np.minimum(edges[:, 1], edges[:, 3]))
+    counts = to_band(np.maximum(edges[:, 1], edges[:, 3])) - b_lo + 1
+    e = np.repeat(np.arange(len(edges)), counts)
+    band = np.repeat(b_lo, counts) + (np.arange(len(e)) - np.repeat(np.cumsum(counts) - counts, counts))
+    order = np.lexsort((feature[e], band))
+    e, band = e[order], band[order]
+    return {
+        "edges": edges[e],
+        "edge_feature": feature[e],
+        "band_offsets": np.searchsorted(band, np.arange(DISTRICT_INDEX_BANDS + 1)),
+        "ymin": ymin,
+        "h": h,
+        "bbox": (float(xy[:, 0].min()), ymin, float(xy[:, 0].max()), ymax),
+        "names": names,
+    }
+
+def assign_districts(index: dict, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """
+    위경도 배열 → 자치구 이름 배열(object, 어느 구에도 속하지 않거나 좌표 없음은 None).
+    띠별로 (점 × 띠 변) 교차 행렬을 한 번에 계산, 피처별 교차 수 홀수(even-odd) → 내부.
+    구멍/월경지도 같은 규칙으로 처리.
+    """
+    out = np.full(len(lat), None, dtype=object)
+    if len(index["edges"]) == 0 or len(lat) == 0:
+        return out
+    minx, miny, maxx, maxy = index["bbox"]
+    valid = np.isfinite(lat) & np.isfinite(lon) & (lat >= miny) & (lat <= maxy) & (lon >= minx) & (lon <= maxx)
+    idx = np.flatnonzero(valid)
+    band = np.clip(np.floor((lat[idx] - index["ymin"]) / index["h"]).astype(np.int64), 0, DISTRICT_INDEX_BANDS - 1)
+    order = np.argsort(band, kind="stable")
+    idx, band = idx[order], band[order]
+    bands, first = np.unique(band, return_index=True)
+    for b, pts in zip(bands, np.split(idx, first[1:])):
+        s, e = index["band_offsets"][b], index["band_offsets"][b + 1]
+        if s == e:
+            continue
+        px, py = lon[pts, None], lat[pts, None]
+        x0, y0, x1, y1 = index["edges"][s:e].T
+        cross = ((y0 > py) != (y1 > py)) & (px < x0 + (py - y0) * (x1 - x0) / (y1 - y0))
+        feat = index["edge_feature"][s:e]
+        starts = np.flatnonzero(np.r_[True, feat[1:] != feat[:-1]])
+        inside = np.add.reduceat(cross, starts, axis=1) % 2 == 1          # (점, 띠 내 피처)
+        hit = inside.any(axis=1)
+        out[pts[hit]] = index["names"][feat[starts][inside.argmax(axis=1)[hit]]]
+    return out
 
 # ---------------------------
 # 전처리 / 파생: 인구소멸지표
@@ -357,111 +1590,316 @@ def compute_extinction_index(df_raw: pd.DataFrame) -> pd.DataFrame:
     out["metric"] = "ext_index"
     return out
 
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_extinction_cube(pop_version: str, _pop_df_raw: pd.DataFrame) -> Dict[Tuple[str, int], pd.DataFrame]:
+    """
+    인구 원자료 버전(내용 해시)별로 1회, (단위 ∈ UNIT_OPTIONS) × (윈도우 ∈ SMOOTH_WINDOWS) 전 조합을 계산.
+    이동평균은 groupby().rolling() 벡터 연산(구별 lambda apply 없음), min_periods = max(1, 윈도우//2).
+    매 rerun은 사전 조회만 수행. 반환 DataFrame은 세션 간 공유 → 수정 금지.
+    """
+    base = compute_extinction_index(_pop_df_raw).sort_values(["group", "date"]).reset_index(drop=True)
+    cube: Dict[Tuple[str, int], pd.DataFrame] = {}
+    for unit in UNIT_OPTIONS:
+        unit_df = base.assign(value=base["value"] / 100.0) if unit == "비율" else base
+        grouped = unit_df.groupby("group", sort=False)["value"]
+        for window in SMOOTH_WINDOWS:
+            if window <= 1:
+                cube[(unit, window)] = unit_df
+                continue
+            smoothed = grouped.rolling(window=window, min_periods=max(1, window // 2)).mean()
+            cube[(unit, window)] = unit_df.assign(value=smoothed.reset_index(level=0, drop=True))
+    return cube
+
 # ---------------------------
 # 시각화
 # ---------------------------
-def choropleth_extinction(df_long: pd.DataFrame, gj: dict, gu_name_keys: List[str], year: int, unit: str):
-    """인구소멸 Choropleth (연도 단면)"""
+def choropleth_extinction(df_long: pd.DataFrame, gj: dict, geometries: List[dict | None], bundle: dict,
+                          year: int, unit: str, palette: str = "기본(파랑→빨강)", scale: str = "선형",
+                          zoom: float | None = None):
+    """인구소멸 Choropleth (연도 단면). geometries: zoom(없으면 초기 화면 줌)에 맞춘 단순화 단계의 피처별 경계"""
     df_y = df_long[df_long["date"].dt.year == year]
-    mapper = {r["group"]: r["value"] for _, r in df_y.iterrows()}
-
-    min_v = df_y["value"].min() if not df_y.empty else 0
-    max_v = df_y["value"].max() if not df_y.empty else 1
-    def norm(v): 
-        if math.isfinite(min_v) and math.isfinite(max_v) and max_v != min_v:
-            return (v - min_v) / (max_v - min_v)
-        return 0.5
-
-    def ramp(t):
-        r = int(255 * t)
-        g = int(120 * (1-t) + 30)
-        b = int(255 * (1-t))
-        return [r,g,b,160]
-
-    layers = []
-    for feat in gj.get("features", []):
-        props = feat.get("properties", {})
-        gu = None
-        for k in gu_name_keys:
-            if k in props:
-                gu = str(props[k]); break
-        if not gu and "name" in props:
-            gu = str(props["name"])
-        val = mapper.get(gu, np.nan)
-        t = norm(val) if pd.notna(val) else 0.0
-        color = ramp(t)
-        layers.append({
-            "type":"PolygonLayer",
-            "data":[feat],
-            "get_polygon":"function f(d){return d.geometry.coordinates}",
-            "get_fill_color": color,
-            "stroked": True,
-            "get_line_color":[80,80,80,200],
-            "line_width_min_pixels": 1,
-            "pickable": True,
-            "autoHighlight": True,
-            "tooltip": True
-        })
-
-    deck_layers = []
-    for L in layers:
-        deck_layers.append(
-            pdk.Layer(
-                "PolygonLayer",
-                L["data"],
-                get_polygon="geometry.coordinates",
-                get_fill_color=L["get_fill_color"],
-                stroked=True,
-                get_line_color=L["get_line_color"],
-                line_width_min_pixels=L["line_width_min_pixels"],
-                pickable=True,
-                auto_highlight=True,
-            )
-        )
+    # 피처 순서에 맞춘 값 배열 → 색상은 배열 연산 한 번
+    values = (
+        df_y.groupby("group")["value"].mean()
+        .reindex(bundle["feature_names"])
+        .to_numpy(dtype=float)
+    )
+    center = EXTINCTION_RISK_RATIO * (1.0 if unit == "비율" else 100.0)
+    colors = colorize(values, palette, scale, center=center)
+    rgba = colors["rgba"].tolist()
+    labels = ["자료 없음" if np.isnan(v) else f"{v:.2f}" if unit == "비율" else f"{v:.1f}" for v in values]
+
+    # 모든 구를 하나의 GeoJsonLayer로: 피처별 색상은 properties.fill_color 데이터 컬럼에서 읽음
+    # (구 개수와 무관하게 레이어 1개 → 직렬화 크기/브라우저 draw call 일정)
+    features = []
+    for feat, geom, gu, color, label in zip(gj.get("features", []), geometries, bundle["feature_names"], rgba, labels):
+        props = dict(feat.get("properties") or {})
+        props.update({"name": gu or props.get("name", ""), "value_label": label, "fill_color": color})
+        features.append({"type": "Feature", "geometry": geom, "properties": props})
 
-    view_state = pdk.ViewState(latitude=37.5665, longitude=126.9780, zoom=9.5, pitch=0)
+    layer = pdk.Layer(
+        "GeoJsonLayer",
+        {"type": "FeatureCollection", "features": features},
+        get_fill_color="properties.fill_color",
+        filled=True,
+        stroked=True,
+        get_line_color=[80,80,80,200],
+        line_width_min_pixels=1,
+        pickable=True,
+        auto_highlight=True,
+    )
+
+    view_state = pdk.ViewState(**{**bundle["view"], "zoom": bundle["view"]["zoom"] if zoom is None else zoom},
+                               pitch=0)
     r = pdk.Deck(
-        layers=deck_layers,
+        layers=[layer],
         initial_view_state=view_state,
-        tooltip={"html":"<b>{name}</b>", "style":{"color":"white"}},
+        tooltip={"html":"<b>{name}</b><br/>{value_label}", "style":{"color":"white"}},
         map_style="light"
     )
     st.pydeck_chart(r, use_container_width=True)
 
+    fmt = "{:.2f}" if unit == "비율" else "{:.1f}"
     legend_html = color_scale_legend_html(
-        "인구소멸지수(여성20–39세/65세이상 ×100)",
-        ["#0000FF","#7F60B0","#BF6090","#FF0000"],
-        [f"{min_v:.1f}", f"{(min_v+max_v)/2:.1f}", f"{max_v:.1f}"]
+        "인구소멸 비율(여성20–39세/65세이상)" if unit == "비율" else "인구소멸지수(여성20–39세/65세이상 ×100)",
+        colors["legend_colors"],
+        [fmt.format(v) for v in colors["legend_ticks"]]
     )
     st.markdown(legend_html, unsafe_allow_html=True)
 
-def points_closed_schools(df_points: pd.DataFrame, gu_centroids: Dict[str,Tuple[float,float]]):
+@st.cache_data(show_spinner=False, max_entries=8)
+def build_extinction_animation(geo_version: str, data_key: str, _geometries: List[dict | None], _bundle: dict,
+                               _df_long: pd.DataFrame, unit: str, palette: str, scale: str,
+                               zoom: float) -> go.Figure:
+    """
+    전 연도 Choropleth를 한 번에 계산해 Plotly 애니메이션 프레임으로 구성.
+    - 피처×연도 값 행렬을 한 번에 만들고 전 기간 공통 척도로 [0,1] 위치 계산(연도 간 색 비교 가능)
+    - 경계(단순화 단계 GeoJSON)는 기본 trace에 1회만 포함, 프레임에는 z/customdata 배열만 포함
+    - 슬라이더/재생 버튼은 브라우저에서 프레임만 교체 → 서버 rerun 없음
+    캐시 키: (geo_version, data_key=원자료 버전+단위+스무딩, unit, palette, scale, zoom)
+    """
+    names = _bundle["feature_names"]
+    wide = (
+        _df_long.assign(year=_df_long["date"].dt.year)
+        .pivot_table(index="group", columns="year", values="value", aggfunc="mean")
+        .reindex(names)
+    )
+    years = [int(y) for y in wide.columns]
+    values = wide.to_numpy(dtype=float)                      # (F, Y)
+    center = EXTINCTION_RISK_RATIO * (1.0 if unit == "비율" else 100.0)
+    t, ticks = scale_values(values.ravel(), scale, center)
+    t = t.reshape(values.shape)
+
+    lut = palette_lut(palette)
+    stops = np.linspace(0, 1, 16)
+    colorscale = [[float(p), "rgb(%d,%d,%d)" % tuple(lut[int(round(p * 255))])] for p in stops]
+    fmt = ".2f" if unit == "비율" else ".1f"
+    locations = [str(i) for i in range(len(names))]
+    geo = {"type": "FeatureCollection",
+           "features": [{"type": "Feature", "id": str(i), "geometry": g, "properties": {}}
+                        for i, g in enumerate(_geometries)]}
+
+    def trace_data(col: int) -> dict:
+        return {"z": t[:, col], "customdata": values[:, col]}
+
+    base = go.Choroplethmap(
+        geojson=geo, locations=locations, text=[n or "" for n in names],
+        zmin=0, zmax=1, colorscale=colorscale, marker_opacity=FILL_ALPHA / 255, marker_line_width=0.8,
+        colorbar=dict(tickvals=list(np.linspace(0, 1, len(ticks))), ticktext=[format(v, fmt) for v in ticks]),
+        hovertemplate=f"<b>%{{text}}</b><br>%{{customdata:{fmt}}}<extra></extra>",
+        **(trace_data(len(years) - 1) if years else {}),
+    )
+    frames = [go.Frame(name=str(y), data=[go.Choroplethmap(**trace_data(i))], traces=[0])
+              for i, y in enumerate(years)]
+    view = _bundle["view"]
+    fig = go.Figure(data=[base], frames=frames)
+    fig.update_layout(
+        map=dict(style="carto-positron", center={"lat": view["latitude"], "lon": view["longitude"]},
+                 zoom=zoom),
+        margin=dict(l=0, r=0, t=0, b=0), height=560,
+        updatemenus=[dict(
+            type="buttons", showactive=False, x=0.02, y=0.02, xanchor="left", yanchor="bottom",
+            buttons=[
+                dict(label="▶ 재생", method="animate",
+                     args=[None, {"frame": {"duration": ANIMATION_FRAME_MS, "redraw": True},
+                                  "transition": {"duration": 0}, "fromcurrent": True}]),
+                dict(label="⏸ 정지", method="animate",
+                     args=[[None], {"frame": {"duration": 0, "redraw": False}, "mode": "immediate"}]),
+            ],
+        )],
+        sliders=[dict(
+            active=len(years) - 1, x=0.15, len=0.83, y=0.02, yanchor="bottom",
+            currentvalue={"prefix": "연도: "},
+            steps=[dict(label=str(y), method="animate",
+                        args=[[str(y)], {"frame": {"duration": 0, "redraw": True}, "mode": "immediate",
+                                         "transition": {"duration": 0}}])
+                   for y in years],
+        )],
+    )
+    if CUSTOM_FONT_AVAILABLE:
+        fig.update_layout(font_family="Pretendard")
+    return fig
+
+def position_closed_points(df_points: pd.DataFrame, gu_centroids: Dict[str,Tuple[float,float]]) -> pd.DataFrame:
     """
-    폐교 점 레이어: 위경도 없으면 구 중심으로 대체
+    폐교 점 좌표: 행 단위로 위경도 중 하나라도 없으면 구 중심으로 대체
     입력 df: 학교명, 폐교연도, 위도, 경도, 자치구
+    - 구 중심은 구 이름 인덱스 DataFrame과 한 번의 join으로 채움
+    - 같은 구의 대체 점은 해바라기 나선(황금각)으로 펼쳐 겹치지 않게 배치(결정적 → rerun마다 동일)
     """
     df = df_points.copy()
-    if "위도" not in df.columns or "경도" not in df.columns:
-        df["lat"] = df["자치구"].map(lambda g: gu_centroids.get(g, (np.nan,np.nan))[0])
-        df["lon"] = df["자치구"].map(lambda g: gu_centroids.get(g, (np.nan,np.nan))[1])
-    else:
-        df["lat"] = pd.to_numeric(df["위도"], errors="coerce")
-        df["lon"] = pd.to_numeric(df["경도"], errors="coerce")
+    nan = pd.Series(np.nan, index=df.index)
+    lat = pd.to_numeric(df["위도"], errors="coerce") if "위도" in df.columns else nan
+    lon = pd.to_numeric(df["경도"], errors="coerce") if "경도" in df.columns else nan
+
+    centroids = pd.DataFrame.from_dict(gu_centroids, orient="index", columns=["c_lat", "c_lon"], dtype=float)
+    fb = df[["자치구"]].join(centroids, on="자치구")
+    missing = (lat.isna() | lon.isna()) & fb["c_lat"].notna()
+    k = df.loc[missing].groupby("자치구").cumcount().to_numpy(dtype=float)
+    r = FALLBACK_SPIRAL_STEP_M * np.sqrt(k)
+    theta = k * math.pi * (3 - math.sqrt(5))
+    c_lat = fb.loc[missing, "c_lat"].to_numpy()
+    c_lon = fb.loc[missing, "c_lon"].to_numpy()
+
+    df["lat"], df["lon"] = lat, lon
+    df.loc[missing, "lat"] = c_lat + r * np.cos(theta) / METERS_PER_DEG_LAT
+    df.loc[missing, "lon"] = c_lon + r * np.sin(theta) / (METERS_PER_DEG_LAT * np.cos(np.radians(c_lat)))
+    df["위치"] = np.where(missing, "구 중심 근사", "좌표")
+
+    return df.dropna(subset=["lat","lon"])
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def closed_points_for_year(stage_version: str, year: int, _points: pd.DataFrame) -> pd.DataFrame:
+    """
+    선택 연도까지(누적) 폐교된 학교 + 폐교연도 미상 학교의 지도용 점. (원자료·경계 버전, 연도)별 캐시.
+    _points는 전체 원자료에 대해 한 번 배치된 좌표(build_closed_stage["points"]) → 연도가 바뀌어도 위치 고정.
+    """
+    if "폐교연도" not in _points.columns:
+        return _points
+    year_col = _points["폐교연도"]
+    return _points[(year_col.le(year) | year_col.isna()).fillna(True).astype(bool)].reset_index(drop=True)
 
-    df = df.dropna(subset=["lat","lon"])
-    layer = pdk.Layer(
-        "ScatterplotLayer",
-        df,
-        get_position='[lon, lat]',
-        get_radius=80,
-        get_fill_color=[200, 30, 0, 180],
-        pickable=True,
+def hex_radius_m(zoom: float) -> float:
+    """확대 수준에서 HEX_RADIUS_PX 픽셀에 해당하는 웹 메르카토르 거리(m)."""
+    return HEX_RADIUS_PX * 2 * math.pi * EARTH_RADIUS_M / (256 * 2**zoom)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def hexbin_closed_points(stage_version: str, year: int, zoom: float, _points: pd.DataFrame) -> pd.DataFrame:
+    """
+    폐교 점 → 웹 메르카토르 평면의 평평한 윗변(flat-top) 육각 격자 집계. (버전, 연도, 확대 수준)별 캐시.
+    축 좌표 계산과 큐브 반올림을 배열 연산으로 한 번에 처리, 칸별 학교 수·연도 범위·상위 2개 구만 전송.
+    반환 컬럼: polygon(경위도 6각), count, years, gus, fill_color
+    """
+    if _points.empty:
+        return pd.DataFrame(columns=["polygon", "count", "years", "gus", "fill_color"])
+    size = hex_radius_m(zoom)
+    x = EARTH_RADIUS_M * np.radians(_points["lon"].to_numpy(dtype=float))
+    y = EARTH_RADIUS_M * np.log(np.tan(np.pi / 4 + np.radians(_points["lat"].to_numpy(dtype=float)) / 2))
+
+    qf = (2 / 3) * x / size
+    rf = (-x / 3 + math.sqrt(3) / 3 * y) / size
+    sf = -qf - rf
+    q, r, s_ = np.round(qf), np.round(rf), np.round(sf)
+    dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s_ - sf)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    q = np.where(fix_q, -r - s_, q)
+    r = np.where(fix_r, -q - s_, r)
+
+    pts = _points.assign(q=q.astype(np.int64), r=r.astype(np.int64))
+    years = pd.to_numeric(pts.get("폐교연도", pd.Series(index=pts.index, dtype=float)), errors="coerce")
+    bins = pts.assign(year=years).groupby(["q", "r"]).agg(
+        count=("lat", "size"), y0=("year", "min"), y1=("year", "max")
+    )
+    ranked = (
+        pts.groupby(["q", "r", "자치구"]).size().rename("n").reset_index()
+        .sort_values(["q", "r", "n"], ascending=[True, True, False])
     )
-    view_state = pdk.ViewState(latitude=37.5665, longitude=126.9780, zoom=10.2, pitch=0)
-    deck = pdk.Deck(layers=[layer], initial_view_state=view_state, map_style="light",
-                    tooltip={"html":"<b>{학교명}</b><br/>폐교연도: {폐교연도}<br/>{자치구}"})
+    ranked["rank"] = ranked.groupby(["q", "r"]).cumcount()
+    top = ranked[ranked["rank"] < 2].pivot(index=["q", "r"], columns="rank", values="자치구").reindex(columns=[0, 1])
+    gus = top[0].astype(object).where(top[1].isna(), top[0].astype(str) + " · " + top[1].astype(str))
+    bins = bins.join(gus.rename("gus")).reset_index()
+
+    hq, hr = bins["q"].to_numpy(dtype=float), bins["r"].to_numpy(dtype=float)
+    cx, cy = size * 1.5 * hq, size * math.sqrt(3) * (hr + hq / 2)
+    ang = np.radians(np.arange(0, 360, 60))
+    vx = cx[:, None] + size * np.cos(ang)
+    vy = cy[:, None] + size * np.sin(ang)
+    v_lon = np.degrees(vx / EARTH_RADIUS_M)
+    v_lat = np.degrees(2 * np.arctan(np.exp(vy / EARTH_RADIUS_M)) - np.pi / 2)
+    polygons = np.round(np.stack([v_lon, v_lat], axis=2), 5).tolist()
+
+    y0, y1 = bins["y0"], bins["y1"]
+    return pd.DataFrame({
+        "polygon": polygons,
+        "count": bins["count"].astype(int),
+        "years": np.where(y0.isna(), "-", np.where(y0 == y1, y0.astype("Int64").astype(str),
+                                                  y0.astype("Int64").astype(str) + "–" + y1.astype("Int64").astype(str))),
+        "gus": bins["gus"].fillna(""),
+        "fill_color": colorize(bins["count"].to_numpy(dtype=float), list(COLOR_PALETTES)[0], "선형")["rgba"].tolist(),
+    })
+
+def points_closed_schools(points: pd.DataFrame, view: Dict[str, float], hexbins: pd.DataFrame | None = None):
+    """
+    폐교 지도: hexbins가 있으면 육각 집계(칸별 학교 수만 전송), 없으면 개별 점.
+    points: closed_points_for_year 결과(학교명, 폐교연도, 자치구, 위치, lat, lon)
+    """
+    if hexbins is not None:
+        layer = pdk.Layer(
+            "PolygonLayer",
+            hexbins,
+            get_polygon="polygon",
+            get_fill_color="fill_color",
+            stroked=True,
+            get_line_color=[255, 255, 255, 200],
+            line_width_min_pixels=1,
+            pickable=True,
+            auto_highlight=True,
+        )
+        tooltip = {"html": "<b>폐교 {count}개교</b><br/>폐교연도: {years}<br/>{gus}"}
+    else:
+        layer = pdk.Layer(
+            "ScatterplotLayer",
+            points,
+            get_position='[lon, lat]',
+            get_radius=80,
+            get_fill_color=[200, 30, 0, 180],
+            pickable=True,
+        )
+        tooltip = {"html":"<b>{학교명}</b><br/>폐교연도: {폐교연도}<br/>{자치구} ({위치})"}
+    view_state = pdk.ViewState(**view, pitch=0)
+    deck = pdk.Deck(layers=[layer], initial_view_state=view_state, map_style="light", tooltip=tooltip)
     st.pydeck_chart(deck, use_container_width=True)
 
+# ---------------------------
+# 내보내기 (클릭 시 생성, 데이터 버전별 캐시)
+# ---------------------------
+@st.cache_data(show_spinner=False, max_entries=24)
+def build_export_payload(data_key: str, fmt: str, _df: pd.DataFrame) -> bytes:
+    """
+    내보내기 바이트 생성. data_key(데이터셋 + 원자료 버전 + 단위/스무딩)가 같으면 재인코딩 없음.
+    gzip CSV는 캐시된 CSV를 압축(mtime=0 → 같은 내용이면 같은 바이트).
+    """
+    if fmt == "Parquet":
+        buf = io.BytesIO()
+        _df.to_parquet(buf, index=False)
+        return buf.getvalue()
+    if fmt == "CSV (gzip)":
+        return gzip.compress(build_export_payload(data_key, "CSV", _df), compresslevel=6, mtime=0)
+    return _df.to_csv(index=False).encode("utf-8-sig")
+
+def export_buttons(df: pd.DataFrame, data_key: str, file_stem: str, label: str):
+    """형식별 다운로드 버튼. data에 callable을 넘겨 클릭 시에만 생성, 클릭으로 재실행하지 않음."""
+    formats = [f for f in EXPORT_FORMATS if f != "Parquet" or PARQUET_AVAILABLE]
+    for col, fmt in zip(st.columns(len(formats)), formats):
+        ext, mime = EXPORT_FORMATS[fmt]
+        col.download_button(
+            f"{label} {fmt}",
+            data=lambda fmt=fmt: build_export_payload(data_key, fmt, df),
+            file_name=f"{file_stem}.{ext}", mime=mime,
+            key=f"dl_{file_stem}_{ext}", on_click="ignore",
+        )
+
 # ---------------------------
 # 앱 UI
 # ---------------------------
@@ -473,23 +1911,29 @@ st.write(APP_DESC)
 st.info("🔄 데이터는 공식 공개 데이터를 우선 사용하며, 연결 실패 시 대체 출처 또는 예시 데이터로 자동 전환합니다. "
         "모든 시계열은 로컬 자정(Asia/Seoul) 이후의 미래 데이터가 자동 제거됩니다.")
 
-# 데이터 로딩
-geojson, geo_source = fetch_seoul_geojson()
-closed_df_raw, closed_source, closed_collected = fetch_closed_schools()
-pop_df_raw, pop_source, pop_collected = fetch_population_components()
+# 데이터 로딩 (3개 출처 동시 요청)
+(
+    (geojson, geo_source),
+    (closed_df_raw, closed_source, closed_collected),
+    (pop_df_raw, pop_source, pop_collected),
+) = load_sources_concurrently()
 
 # 데이터 소스 배너
 if "예시" in (geo_source + closed_source + pop_source):
     st.warning("⚠️ 일부 데이터는 예시/대체 출처를 사용 중입니다. 실제 분석 전 공식 데이터 연결/키 설정을 권장합니다.")
 
-# 사이드바 컨트롤
+st.caption(f"🕒 데이터 갱신 시점 — 경계: {source_age_label('seoul_geojson')} · "
+           f"폐교: {source_age_label('closed_schools')} · 인구: {source_age_label('population')}")
+
+# 사이드바 컨트롤 (파생 데이터 전체에 영향 → 전체 재실행)
+# 연도/색상은 지도 fragment, 구 선택은 구별 비교 fragment 안에 두어 해당 부분만 재실행
 st.sidebar.header("필터")
+metric_choice = st.sidebar.radio("지표 선택", ["폐교 현황", "인구소멸 지표"], index=0)
+smooth_win = st.sidebar.select_slider("스무딩(이동평균 윈도우)", options=SMOOTH_WINDOWS, value=1)
+unit_choice = st.sidebar.radio("단위", UNIT_OPTIONS, index=0, help="본 앱에서는 지수=여성20–39세/65세이상×100")
+
 year_min = 2000
 year_max = TODAY.year
-sel_year = st.sidebar.slider("연도 선택", min_value=year_min, max_value=year_max, value=min(year_max, max(year_min, TODAY.year-1)))
-metric_choice = st.sidebar.radio("지표 선택", ["폐교 현황", "인구소멸 지표"], index=0)
-smooth_win = st.sidebar.select_slider("스무딩(이동평균 윈도우)", options=[1,3,5], value=1)
-unit_choice = st.sidebar.radio("단위", ["지수(×100)", "비율"], index=0, help="본 앱에서는 지수=여성20–39세/65세이상×100")
 
 # 구 선택
 all_gus = [
@@ -497,17 +1941,31 @@ all_gus = [
     "노원구","은평구","서대문구","마포구","양천구","강서구","구로구","금천구","영등포구","동작구",
     "관악구","서초구","강남구","송파구","강동구"
 ]
-sel_gus = st.sidebar.multiselect("구 선택(시계열 비교)", options=all_gus, default=["종로구","서초구","강남구"])
 
 # ---------------------------
 # 전처리: 폐교 집계 테이블 (표준 스키마)
 # ---------------------------
-def build_closed_agg(df_raw: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def build_closed_agg(df_raw: pd.DataFrame, district_index: dict | None = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
     df = df_raw.copy()
     if "자치구" not in df.columns:
         gu_col = next((c for c in df.columns if "구" in c), None)
         if gu_col:
             df = df.rename(columns={gu_col:"자치구"})
+    # 자치구가 없거나 경계의 구 이름과 맞지 않는 행만 좌표로 점-다각형 판정해 채움(유효한 원자료 값은 유지)
+    if district_index is not None and {"위도", "경도"} <= set(df.columns):
+        if "자치구" not in df.columns:
+            df["자치구"] = pd.Series(pd.NA, index=df.index, dtype=object)
+        known = {n for n in district_index["names"] if n}
+        valid = df["자치구"].map(lambda g: pd.notna(g) and normalize_gu_name(g) in known).astype(bool)
+        todo = df.index[~valid]
+        if len(todo):
+            spatial = assign_districts(
+                district_index,
+                pd.to_numeric(df.loc[todo, "위도"], errors="coerce").to_numpy(dtype=float),
+                pd.to_numeric(df.loc[todo, "경도"], errors="coerce").to_numpy(dtype=float),
+            )
+            hit = pd.notna(spatial)
+            df.loc[todo[hit], "자치구"] = spatial[hit]
     if "폐교연도" not in df.columns:
         ycol = next((c for c in df.columns if "연도" in c or "년도" in c), None)
         if ycol:
@@ -516,7 +1974,7 @@ def build_closed_agg(df_raw: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     if "폐교연도" in df.columns:
         df["폐교연도"] = pd.to_numeric(df["폐교연도"], errors="coerce").astype("Int64")
     agg = df.dropna(subset=["자치구","폐교연도"]).groupby(["자치구","폐교연도"]).size().reset_index(name="폐교수")
-    agg["date"] = pd.to_datetime(agg["폐교연도"].astype(int).astype(str) + "-01-01")
+    agg["date"] = pd.to_datetime(pd.DataFrame({"year": agg["폐교연도"].astype(int), "month": 1, "day": 1}))
     if getattr(agg["date"].dt, "tz", None) is None:
         agg["date"] = agg["date"].dt.tz_localize(TZ)
     else:
@@ -525,65 +1983,172 @@ def build_closed_agg(df_raw: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     agg = remove_future_rows(agg, "date").sort_values(["group","date"]).reset_index(drop=True)
     return df, agg[["date","value","group"]]
 
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_closed_stage(closed_version: str, geo_version: str, _closed_df_raw: pd.DataFrame,
+                       _district_index: dict | None, _gu_centroids: Dict[str, Tuple[float, float]]) -> dict:
+    """
+    (폐교 원자료 버전, 경계 버전)별 1회 집계 → 탭/세션 간 공유(수정 금지).
+      version    : "원자료 버전:경계 버전" (하위 캐시 키)
+      raw        : 컬럼 표준화 + 좌표 기반 자치구 배정된 원자료 (build_closed_agg)
+      points     : 지도용 점(전체 원자료 기준 1회 배치 → 연도 필터와 무관하게 위치 고정, 툴팁 컬럼만)
+      long       : 표준 스키마 [date, value, group]
+      by_year    : 연도 → [자치구, 폐교수] (폐교수 내림차순) — 연도별 표는 사전 조회
+      by_gu_year : 자치구 × 연도 폐교수 피벗
+      by_gu_total: 자치구 → 누적 폐교수
+    """
+    raw, long_df = build_closed_agg(_closed_df_raw, _district_index)
+    per_year = (
+        long_df.assign(year=long_df["date"].dt.year)
+        .groupby(["year", "group"], as_index=False)["value"].sum()
+        .rename(columns={"group": "자치구", "value": "폐교수"})
+        .sort_values(["year", "폐교수"], ascending=[True, False])
+    )
+    by_year = {int(y): d.drop(columns="year").reset_index(drop=True) for y, d in per_year.groupby("year")}
+    by_gu_year = per_year.pivot(index="자치구", columns="year", values="폐교수").fillna(0).astype(int)
+    points = position_closed_points(raw, _gu_centroids)
+    point_cols = [c for c in ["학교명", "폐교연도", "자치구", "위치", "lat", "lon"] if c in points.columns]
+    return {
+        "version": f"{closed_version}:{geo_version}",
+        "raw": raw,
+        "points": points[point_cols].reset_index(drop=True),
+        "long": long_df,
+        "by_year": by_year,
+        "by_gu_year": by_gu_year,
+        "by_gu_total": by_gu_year.sum(axis=1),
+    }
+
 # ---------------------------
 # 전처리: 인구소멸지수 (표준 스키마)
 # ---------------------------
-ext_long = compute_extinction_index(pop_df_raw)
-if unit_choice == "비율":
-    ext_long = ext_long.copy()
-    ext_long["value"] = ext_long["value"] / 100.0
-
-if smooth_win and smooth_win > 1:
-    ext_long = (
-        ext_long.sort_values(["group","date"])
-        .groupby("group", group_keys=False)
-        .apply(lambda d: d.assign(value=moving_average(d["value"], smooth_win)))
-        .reset_index(drop=True)
-    )
+# 원자료 버전별로 (단위 × 윈도우) 전 조합을 미리 계산한 큐브에서 조회
+pop_version = source_version("population", pop_df_raw)
+ext_long = build_extinction_cube(pop_version, pop_df_raw)[(unit_choice, smooth_win)]
+ext_data_key = f"{pop_version}:{unit_choice}:{smooth_win}"
 
 # ---------------------------
 # 지도용 중심 좌표 사전
 # ---------------------------
 gu_name_keys = ["name_2", "SIG_KOR_NM", "SIG_ENG_NM", "adm_nm", "EMD_KOR_NM", "name"]
-gu_centroids = build_gu_centroids(geojson, gu_name_keys)
+# geojson 버전(내용 해시)별 캐시 → rerun마다 이름 탐색/중심 계산 반복 없음
+geo_bundle_version = source_version("seoul_geojson", geojson)
+geo_bundle = build_geometry_bundle(geo_bundle_version, geojson, tuple(gu_name_keys))
 
 # ---------------------------
-# 탭 구성
+# 폐교 집계 (원자료·경계 버전별 캐시, 탭/세션 공통)
 # ---------------------------
-tab1, tab2, tab3 = st.tabs(["🗺️ 폐교 지도", "🗺️ 인구소멸 지도", "📄 표/다운로드"])
+closed_version = source_version("closed_schools", closed_df_raw)
+closed_stage = build_closed_stage(closed_version, geo_bundle_version, closed_df_raw,
+                                  build_district_index(geo_bundle_version, geo_bundle), geo_bundle["gu_centroids"])
+closed_long = closed_stage["long"]
 
-with tab1:
+# ---------------------------
+# 화면 단위(fragment): 위젯이 바뀌면 해당 fragment만 재실행, 인자는 마지막 전체 실행 값 재사용
+# ---------------------------
+# 선택된 화면만 렌더링하므로 숨겨진 위젯의 상태는 Streamlit이 정리함 →
+# 선택값은 위젯과 별개의 "keep_<key>" 세션 키에 보관하고, 위젯을 다시 그릴 때 초기값으로 사용
+def kept(key: str, default):
+    """화면 전환 후에도 유지되는 위젯 선택값(없으면 default)."""
+    return st.session_state.get(f"keep_{key}", default)
+
+def keep(key: str):
+    """위젯 on_change: 현재 값을 keep_<key>에 복사."""
+    st.session_state[f"keep_{key}"] = st.session_state[key]
+
+def kept_index(key: str, options: List, default: int = 0) -> int:
+    value = kept(key, None)
+    return options.index(value) if value in options else default
+
+@st.fragment
+def render_year_maps(metric_choice: str, closed_stage: dict, ext_long: pd.DataFrame,
+                     geojson: dict, geo_bundle: dict, geo_version: str, data_key: str, unit_choice: str):
+    """연도 선택/색상 설정 → 사이드바에서 고른 지표의 지도(폐교 또는 인구소멸)만 재실행."""
+    c_year, c_palette, c_scale = st.columns([2, 1, 1])
+    sel_year = c_year.slider("연도 선택", min_value=year_min, max_value=year_max,
+                             value=min(year_max, max(year_min, kept("sel_year", TODAY.year-1))),
+                             key="sel_year", on_change=keep, args=("sel_year",))
+
+    if metric_choice == "폐교 현황":
+        render_closed_map(closed_stage, geo_bundle, sel_year)
+        return
+
+    palette_choice = c_palette.selectbox("색상 팔레트", list(COLOR_PALETTES),
+                                         index=kept_index("palette_choice", list(COLOR_PALETTES)),
+                                         key="palette_choice", on_change=keep, args=("palette_choice",))
+    scale_choice = c_scale.radio("색상 척도", COLOR_SCALES, index=kept_index("scale_choice", COLOR_SCALES),
+                                 key="scale_choice", on_change=keep, args=("scale_choice",),
+                                 help="발산: 소멸위험 기준(여성20–39/65+ = 0.5)을 중심으로 대칭")
+    render_extinction_map(ext_long, geojson, geo_bundle, geo_version, data_key, unit_choice,
+                          sel_year, palette_choice, scale_choice)
+
+def render_closed_map(closed_stage: dict, geo_bundle: dict, sel_year: int):
+    """폐교 점 지도 + 선택 연도 구별 폐교 건수."""
     st.subheader("서울시 폐교 현황 (자치구)")
-    raw_closed, closed_long = build_closed_agg(closed_df_raw)
-
+    c_mode, c_zoom = st.columns([2, 1])
+    point_mode = c_mode.radio("표시 방식", POINT_MODES, index=kept_index("point_mode", POINT_MODES),
+                              horizontal=True, key="point_mode", on_change=keep, args=("point_mode",),
+                              help=f"자동: 확대 수준 {POINT_DETAIL_ZOOM:g} 미만은 육각 집계, 이상은 개별 점")
+    zoom_lo, zoom_hi = MAP_ZOOM_RANGE
+    zoom = c_zoom.slider("확대 수준", min_value=zoom_lo, max_value=zoom_hi, step=0.5,
+                         value=min(zoom_hi, max(zoom_lo, kept("point_zoom", round(geo_bundle["view"]["zoom"] * 2) / 2))),
+                         key="point_zoom", on_change=keep, args=("point_zoom",))
     try:
-        points_closed_schools(raw_closed, gu_centroids)
+        version = closed_stage["version"]
+        points = closed_points_for_year(version, sel_year, closed_stage["points"])
+        use_hex = point_mode == "육각 집계" or (point_mode == "자동" and zoom < POINT_DETAIL_ZOOM)
+        hexbins = hexbin_closed_points(version, sel_year, zoom, points) if use_hex else None
+        points_closed_schools(points, {**geo_bundle["view"], "zoom": zoom}, hexbins)
+        n_unknown = int(points["폐교연도"].isna().sum()) if "폐교연도" in points.columns else 0
+        summary = f"{sel_year}년까지 폐교 {len(points):,}개교" + (
+            f" (폐교연도 미상 {n_unknown:,}개교 포함)" if n_unknown else "")
+        if hexbins is not None:
+            st.caption(f"{summary} → 육각 {len(hexbins):,}칸 "
+                       f"(반지름 ≈ {hex_radius_m(zoom) * math.cos(math.radians(geo_bundle['view']['latitude'])):,.0f}m)")
+        else:
+            st.caption(summary)
     except Exception as e:
         st.error(f"폐교 점 레이어 표시 중 오류: {e}")
 
-    st.markdown("**세부 목록 (선택 구 필터 적용)**")
-    show_df = raw_closed.copy()
-    if sel_gus:
-        show_df = show_df[show_df["자치구"].isin(sel_gus)]
-    st.dataframe(show_df.reset_index(drop=True), use_container_width=True)
-
     st.markdown(f"**{sel_year}년 구별 폐교 건수 (표준 스키마)**")
-    agg_year = (
-        closed_long[closed_long["date"].dt.year == sel_year]
-        .groupby("group", as_index=False)["value"].sum()
-        .rename(columns={"group":"자치구","value":"폐교수"})
-        .sort_values("폐교수", ascending=False)
-    )
+    agg_year = closed_stage["by_year"].get(sel_year, pd.DataFrame(columns=["자치구", "폐교수"]))
     st.dataframe(agg_year, use_container_width=True)
 
-with tab2:
+def render_extinction_map(ext_long: pd.DataFrame, geojson: dict, geo_bundle: dict, geo_version: str,
+                          data_key: str, unit_choice: str, sel_year: int, palette_choice: str, scale_choice: str):
+    """인구소멸 Choropleth(선택 연도) 또는 전 연도 애니메이션."""
     st.subheader("서울시 인구소멸 지표 (자치구)")
     st.caption("정의: 인구소멸지수 = (여성 20–39세 인구 / 65세 이상 인구) × 100  (본 앱의 단순 정의)")
+    animate = st.toggle("⏯️ 전 연도 애니메이션 (브라우저에서 재생, 서버 재실행 없음)", value=kept("animate", False),
+                        key="animate", on_change=keep, args=("animate",))
+    zoom_lo, zoom_hi = MAP_ZOOM_RANGE
+    zoom = st.slider("확대 수준", min_value=zoom_lo, max_value=zoom_hi, step=0.5,
+                     value=min(zoom_hi, max(zoom_lo, kept("ext_zoom", round(geo_bundle["view"]["zoom"] * 2) / 2))),
+                     key="ext_zoom", on_change=keep, args=("ext_zoom",),
+                     help="확대 수준에 맞는 경계 단순화 단계(overview/district/detail)만 전송")
     try:
-        choropleth_extinction(ext_long, geojson, gu_name_keys, sel_year, unit_choice)
+        # 애니메이션은 지도 높이가 커서 0.5 낮춘 줌으로 표시, 단계도 그 줌 기준
+        map_zoom = zoom - (0.5 if animate else 0.0)
+        tier = pick_boundary_tier(map_zoom)
+        geometries = decode_boundary_tier(build_boundary_tiers(geo_version, geojson), tier)
+        if animate:
+            fig_anim = build_extinction_animation(
+                geo_version, data_key, geometries, geo_bundle, ext_long, unit_choice, palette_choice, scale_choice,
+                map_zoom,
+            )
+            st.plotly_chart(fig_anim, use_container_width=True)
+        else:
+            choropleth_extinction(ext_long, geojson, geometries, geo_bundle, sel_year, unit_choice,
+                                  palette_choice, scale_choice, zoom=map_zoom)
+        st.caption(f"경계 단순화 단계: {tier}")
     except Exception as e:
         st.error(f"인구소멸 Choropleth 표시 중 오류: {e}")
 
+@st.fragment
+def render_district_compare(closed_stage: dict, ext_long: pd.DataFrame):
+    """구 선택 → 시계열 꺾은선과 폐교 세부 목록만 재실행."""
+    sel_gus = st.multiselect("구 선택(시계열 비교)", options=all_gus,
+                             default=[g for g in kept("sel_gus", ["종로구","서초구","강남구"]) if g in all_gus],
+                             key="sel_gus", on_change=keep, args=("sel_gus",))
+
     st.markdown("**선택 구 시계열 비교 (꺾은선)**")
     line_df = ext_long[ext_long["group"].isin(sel_gus)].copy()
     if line_df.empty:
@@ -599,19 +2164,40 @@ with tab2:
             fig.update_layout(font_family="Pretendard")
         st.plotly_chart(fig, use_container_width=True)
 
-with tab3:
-    st.subheader("표준 스키마 테이블 & CSV 다운로드")
-    raw_closed, closed_long = build_closed_agg(closed_df_raw)
+    st.markdown("**폐교 세부 목록 (선택 구 필터 적용)**")
+    totals = closed_stage["by_gu_total"]
+    if sel_gus:
+        st.caption("누적 폐교 수 — " + " · ".join(f"{g}: {int(totals.get(g, 0))}" for g in sel_gus))
+    show_df = closed_stage["raw"]
+    if sel_gus:
+        show_df = show_df[show_df["자치구"].isin(sel_gus)]
+    st.dataframe(show_df.reset_index(drop=True), use_container_width=True)
+
+# ---------------------------
+# 화면 전환 (선택된 화면만 실행)
+# ---------------------------
+# st.tabs는 숨겨진 탭 본문까지 매 rerun 실행하므로, 라디오로 고른 화면 하나만 데이터 준비/차트 생성
+view_choice = st.radio("화면", VIEW_OPTIONS, index=0, horizontal=True, key="view",
+                       label_visibility="collapsed")
+
+if view_choice == VIEW_OPTIONS[0]:
+    render_year_maps(metric_choice, closed_stage, ext_long, geojson, geo_bundle, geo_bundle_version,
+                     ext_data_key, unit_choice)
+
+elif view_choice == VIEW_OPTIONS[1]:
+    render_district_compare(closed_stage, ext_long)
+
+else:
+    st.subheader("표준 스키마 테이블 & 다운로드")
 
     st.markdown("**폐교(구별·연도별 집계): columns = [date, value, group]**")
     st.dataframe(closed_long, use_container_width=True)
-    csv_closed = closed_long.to_csv(index=False).encode("utf-8-sig")
-    st.download_button("폐교 집계 CSV 다운로드", csv_closed, file_name="closed_schools_agg.csv", mime="text/csv")
+    export_buttons(closed_long, f"closed:{closed_stage['version']}", "closed_schools_agg", "폐교 집계")
 
     st.markdown("**인구소멸 지표(구별·연도별): columns = [date, value, group, metric]**")
     st.dataframe(ext_long, use_container_width=True)
-    csv_ext = ext_long.to_csv(index=False).encode("utf-8-sig")
-    st.download_button("인구소멸 지표 CSV 다운로드", csv_ext, file_name="extinction_index.csv", mime="text/csv")
+    ext_file_stem = f"extinction_index_{'ratio' if unit_choice == '비율' else 'x100'}_ma{smooth_win}"
+    export_buttons(ext_long, f"extinction:{ext_data_key}", ext_file_stem, "인구소멸 지표")
 
 # ---------------------------
 # 출처/수집일자/라이선스/폰트 안내
@@ -619,12 +2205,12 @@ with tab3:
 st.divider()
 st.markdown("### 🔗 출처(우선순위), 수집일자, 라이선스 고지")
 st.markdown(f"""
-- **행정경계(서울시 자치구)**: {geo_source}  
+- **행정경계(서울시 자치구)**: {geo_source}, 갱신: {source_age_label('seoul_geojson')}  
   - SGIS(통계지리정보서비스) API 권장: https://sgis.kostat.go.kr  
   - (대체 사용 시) GitHub 단순화 GeoJSON (비공식)  
-- **폐교 현황**: {closed_source}, 수집일자: {closed_collected}  
+- **폐교 현황**: {closed_source}, 수집일자: {closed_collected}, 갱신: {source_age_label('closed_schools')}  
   - 권장: data.go.kr(교육부/KEIS) '폐교 현황' 데이터셋 또는 CSV  
-- **인구 구성(여성 20–39, 65+)**: {pop_source}, 수집일자: {pop_collected}  
+- **인구 구성(여성 20–39, 65+)**: {pop_source}, 수집일자: {pop_collected}, 갱신: {source_age_label('population')}  
   - 권장: KOSTAT/KOSIS OpenAPI 사용자 통계표
 - **라이선스**: 각 출처의 이용약관/저작권 지침을 준수하세요.
 """)